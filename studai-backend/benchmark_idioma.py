@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# ============================================================================
+# BENCHMARK Y EQUIVALENCIA DEL DETECTOR DE IDIOMA
+# ============================================================================
+# Compara el detector de una sola pasada (services/language.py) con la heuristica
+# anterior (copiada aqui tal cual estaba en genScript.py y genTTS.py):
+# - equivalencia: ambos deben dar el mismo resultado en todos los casos
+# - micro-benchmark: tiempo por llamada de cada uno
+#
+# Uso:
+#     python benchmark_idioma.py [archivo.txt ...]
+#
+# Los archivos opcionales se agregan como texto de PDF (sin peticion del usuario).
+# Termina con codigo 1 si algun caso da un resultado distinto.
+# ============================================================================
+
+import re
+import sys
+import timeit
+
+from services import language
+
+LANGUAGE_SAMPLE_CHARS = 12000
+
+
+# ============================================================================
+# HEURISTICA ANTERIOR (REFERENCIA)
+# ============================================================================
+def legacy_infer_target_script_language(pdf_text, user_additional_input):
+    user = (user_additional_input or "").strip().lower()
+    sample = (pdf_text or "")[:LANGUAGE_SAMPLE_CHARS].lower()
+    blob_user = f" {user} "
+    blob_pdf = f" {sample} "
+
+    def explicit_spanish(s):
+        return any(p in s for p in (
+            "español", "espanol", "en español", "en espanol", "castellano", "habla en español",
+            "guion en español", "video en español", "guión en español", "guion en espanol",
+        ))
+
+    def explicit_english(s):
+        return any(p in s for p in (
+            "english", "in english", "en inglés", "en ingles", "script in english", "video in english",
+        ))
+
+    SPANISH_USER_WORDS = (
+        "que", "como", "cómo", "para", "con", "una", "unos", "unas", "los", "las", "más", "mas",
+        "también", "tambien", "este", "esta", "muy", "sobre", "hacer", "haz", "usa", "quiero",
+        "tono", "estilo", "palabras", "palabra", "incluye", "incluir", "explica", "breve", "corto",
+        "divertido", "formal", "educativo", "coloquial", "guion", "guión", "video", "nada", "algo",
+        "así", "asi",
+    )
+    ENGLISH_USER_WORDS = (
+        "the", "and", "with", "that", "this", "from", "your", "make", "please", "want", "tone",
+        "style", "keywords", "funny", "serious", "short", "include", "explain", "script",
+    )
+
+    if user:
+        if explicit_spanish(user) and not explicit_english(user):
+            return "spanish"
+        if explicit_english(user) and not explicit_spanish(user):
+            return "english"
+        if any(c in user for c in "áéíóúñü¿¡"):
+            return "spanish"
+        sp_u = sum(blob_user.count(f" {w} ") for w in SPANISH_USER_WORDS)
+        en_u = sum(blob_user.count(f" {w} ") for w in ENGLISH_USER_WORDS)
+        if len(user) >= 4 and sp_u > en_u:
+            return "spanish"
+        if len(user) >= 4 and en_u > sp_u:
+            return "english"
+        if re.search(r"\b(hazlo|haz|usa|usar|cuéntame|cuentame|pon|ponme|dime|explicame|explícame)\b", user):
+            return "spanish"
+        if re.search(r"\b(make|use|tell me|give me|keep it)\b", user) and sp_u == 0:
+            return "english"
+
+    if user:
+        return "auto"
+
+    if explicit_spanish(sample) and not explicit_english(sample[:800]):
+        return "spanish"
+
+    spanish_chars = sum(1 for c in (pdf_text or "")[:8000] if c in "áéíóúñüÁÉÍÓÚÑÜ¿¡")
+    sp_pdf = sum(blob_pdf.count(f" {w} ") for w in (
+        "el", "la", "de", "que", "los", "las", "una", "con", "por", "para", "como", "más", "mas",
+        "también", "tambien",
+    ))
+    if spanish_chars >= 8 or sp_pdf >= 22:
+        return "spanish"
+
+    en_pdf = sum(blob_pdf.count(f" {w} ") for w in (
+        "the", "and", "of", "to", "in", "is", "for", "that", "with", "as", "on", "are", "by", "from",
+    ))
+    if en_pdf >= 35 and spanish_chars < 4:
+        return "english"
+
+    return "auto"
+
+
+def legacy_detect_language(text):
+    head = text.strip()[:24].upper()
+    if re.match(r"^\[(?:SP|ES)\]", head, re.IGNORECASE):
+        return "spanish"
+    if "[SP]" in text.upper() or "[ES]" in text.upper():
+        return "spanish"
+    if re.match(r"^\[EN\]", head, re.IGNORECASE) or "[EN]" in text.upper():
+        return "english"
+    return "english"
+
+
+# ============================================================================
+# CASOS
+# ============================================================================
+_ES_PARAGRAPH = (
+    "La Primera Revolución Industrial fue un proceso de transformación económica, social y "
+    "tecnológica que se inició en la segunda mitad del siglo XVIII en el Reino de Gran Bretaña. "
+    "Las máquinas de vapor cambiaron la forma de producir y también la vida de los trabajadores, "
+    "que dejaron el campo para ir a las fábricas de las ciudades. "
+)
+_ES_PARAGRAPH_PLAIN = (
+    "La produccion textil crecio con la maquina de vapor y el uso del carbon como fuente de "
+    "energia para las fabricas de la region, que atrajeron a los trabajadores del campo con "
+    "salarios bajos y jornadas largas para toda la familia. "
+)
+_EN_PARAGRAPH = (
+    "The Industrial Revolution was the transition to new manufacturing processes in Great Britain "
+    "and the United States in the period from about 1760 to 1840. It is one of the most important "
+    "events in history, as almost every aspect of daily life was influenced by the new machines "
+    "that were built with steam power and iron. "
+)
+_MIXED_PARAGRAPH = "Cloud security: RBAC, Managed Identities, Key Vault. 12 / 40 "
+# Texto de diapositivas: lineas cortas separadas por saltos de linea (la forma
+# normal del texto extraido de un PDF de PowerPoint)
+_EN_SLIDES = "\n".join(["The agent\nof the\nworld\nis in\nthe loop"] * 10)
+_ES_SLIDES = "\n".join(["Agentes Inteligentes\nEl agente percibe\nel entorno y\nactúa sobre él\n12"] * 15)
+_EN_SLIDE_BULLETS = "\n".join(
+    ["• The agent perceives the environment", "• Sensors and actuators", "Rational agents", "7"] * 12
+)
+
+PDF_CASES = [
+    _ES_PARAGRAPH * 40,
+    _ES_PARAGRAPH_PLAIN * 40,
+    _EN_PARAGRAPH * 40,
+    _EN_PARAGRAPH * 40 + "Autor: José Núñez",
+    _MIXED_PARAGRAPH * 30,
+    "Curso de inglés. Material en español para estudiantes.\n" + _EN_PARAGRAPH * 20,
+    "English version below.\n" + _ES_PARAGRAPH * 20,
+    _EN_SLIDES,
+    _ES_SLIDES,
+    _EN_SLIDE_BULLETS,
+    "la " * 30,
+    "the and of " * 20,
+    "",
+]
+
+USER_CASES = [
+    "",
+    "Haz el video en español, no en inglés. Y usa palabras coloquiales como no mames, o wey, etc.",
+    "hazlo gracioso",
+    "Make it funny and short please",
+    "script in english, tono formal",
+    "quiero un tono divertido para el video",
+    "keep it simple",
+    "use slang",
+    "RBAC keys",
+    "explica con ejemplos",
+    "tell me a story about the topic",
+    "dime algo breve",
+    "formal",
+    "¿puedes hacerlo corto?",
+    "video in english please",
+    "habla en castellano",
+    "hazlo\ncon\nla\nvoz\nde\nun\nprofesor",
+    "make it\nfun",
+    "la la la",
+]
+
+SCRIPT_CASES = [
+    "[SP]: Hola a todos, hoy hablamos de la revolución industrial.",
+    "[ES]: Bienvenidos al video.",
+    "[EN]: Welcome to the video.",
+    "  [es] texto con etiqueta en minusculas",
+    "Sin etiqueta al inicio [SP] pero despues si",
+    "[EN]: mixed tags [ES] later",
+    "No tag at all",
+]
+
+
+def equivalence() -> int:
+    """Cuenta los casos en que el detector nuevo difiere de la heuristica anterior."""
+    mismatches = 0
+    for pdf_text in PDF_CASES:
+        for user in USER_CASES:
+            expected = legacy_infer_target_script_language(pdf_text, user)
+            got = language.infer_target_script_language(pdf_text, user)
+            if got != expected:
+                mismatches += 1
+                print(f"❌ idioma del guion: usuario={user!r} pdf={pdf_text[:40]!r}... anterior={expected} nuevo={got}")
+    for script in SCRIPT_CASES:
+        expected = legacy_detect_language(script)
+        got = language.detect_script_language(script)
+        if got != expected:
+            mismatches += 1
+            print(f"❌ idioma del audio: {script!r} anterior={expected} nuevo={got}")
+    total = len(PDF_CASES) * len(USER_CASES) + len(SCRIPT_CASES)
+    print(f"🔎 Equivalencia: {total - mismatches}/{total} caso(s) iguales")
+    return mismatches
+
+
+def benchmark(name: str, legacy, current, cases, number: int = 200) -> None:
+    legacy_s = timeit.timeit(lambda: [legacy(*c) for c in cases], number=number)
+    current_s = timeit.timeit(lambda: [current(*c) for c in cases], number=number)
+    calls = number * len(cases)
+    print(
+        f"{name:<28} anterior {legacy_s / calls * 1e6:8.1f} µs/llamada   "
+        f"nuevo {current_s / calls * 1e6:8.1f} µs/llamada   ({legacy_s / current_s:4.1f}x)"
+    )
+
+
+def main():
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as f:
+            PDF_CASES.append(f.read())
+
+    mismatches = equivalence()
+    print()
+    benchmark("PDF sin peticion", legacy_infer_target_script_language,
+              language.infer_target_script_language, [(t, "") for t in PDF_CASES])
+    benchmark("peticion del usuario", legacy_infer_target_script_language,
+              language.infer_target_script_language, [("", u) for u in USER_CASES])
+    benchmark("etiqueta del guion", legacy_detect_language,
+              language.detect_script_language, [(s,) for s in SCRIPT_CASES], number=2000)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
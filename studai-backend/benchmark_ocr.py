@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# ============================================================================
+# BENCHMARK DEL RASTERIZADO PARA OCR
+# ============================================================================
+# Compara, pagina por pagina, el camino anterior del OCR (pixmap RGB a 72 DPI ->
+# PNG -> PIL -> Tesseract) contra el actual (pixmap en grises a OCR_DPI entregado
+# directo a PIL/Tesseract, ver services/ocr.py), y un DPI mayor para decidir si
+# vale la pena subir OCR_DPI (mas caracteres reconocidos contra mas tiempo).
+#
+# Uso:
+#     python benchmark_ocr.py ruta/al/escaneado.pdf [max_paginas] [dpi_alto]
+# ============================================================================
+
+import io
+import sys
+import time
+
+import fitz
+import pytesseract
+from PIL import Image
+
+from services import ocr
+
+
+def legacy_page(page: "fitz.Page") -> tuple[str, int]:
+    """Camino anterior: render por defecto -> PNG -> decodificar -> Tesseract."""
+    pix = page.get_pixmap()
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    text = pytesseract.image_to_string(image, lang=ocr.OCR_LANG)
+    return text, len(pix.samples)
+
+
+def current_page(page: "fitz.Page", dpi: int, grayscale: bool, binarize: int) -> tuple[str, int]:
+    """Camino actual: pixmap compartido con PIL sin PNG intermedio."""
+    image, pix = ocr.render_page_image(page, dpi=dpi, grayscale=grayscale, binarize=binarize)
+    text, _ = ocr._recognize(image, ocr.OCR_LANG)
+    return text, len(pix.samples)
+
+
+def run(name: str, doc: "fitz.Document", pages: int, fn) -> None:
+    total_time = 0.0
+    total_bytes = 0
+    total_chars = 0
+    for page_num in range(pages):
+        page = doc.load_page(page_num)
+        start = time.perf_counter()
+        text, raster_bytes = fn(page)
+        total_time += time.perf_counter() - start
+        total_bytes += raster_bytes
+        total_chars += len(text.strip())
+    print(
+        f"{name:<32} {total_time / pages * 1000:8.0f} ms/pag   "
+        f"{total_bytes / pages / (1024 * 1024):6.2f} MB raster/pag   {total_chars:7d} caracteres"
+    )
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python benchmark_ocr.py ruta/al/escaneado.pdf [max_paginas] [dpi_alto]")
+        return
+
+    pdf_path = sys.argv[1]
+    max_pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    high_dpi = int(sys.argv[3]) if len(sys.argv) > 3 else 150
+    with fitz.open(pdf_path) as doc:
+        pages = min(len(doc), max_pages)
+        print(f"📄 {pdf_path}: {pages} pagina(s), tesserocr={'si' if ocr.get_tesserocr() else 'no'}\n")
+        run("anterior (RGB 72dpi + PNG)", doc, pages, legacy_page)
+        run(f"gris {ocr.OCR_DPI}dpi sin PNG", doc, pages,
+            lambda p: current_page(p, ocr.OCR_DPI, True, 0))
+        run(f"binarizado {ocr.OCR_DPI}dpi sin PNG", doc, pages,
+            lambda p: current_page(p, ocr.OCR_DPI, True, 160))
+        run(f"gris {high_dpi}dpi sin PNG", doc, pages,
+            lambda p: current_page(p, high_dpi, True, 0))
+
+
+if __name__ == "__main__":
+    main()
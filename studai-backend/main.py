@@ -13,19 +13,27 @@
 # 4. STT: Transcripcion de audio (videoEditor.py - AssemblyAI, opcional)
 # ============================================================================
 
-from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException, BackgroundTasks
-import os, uuid, shutil, asyncio
+from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException, Header
+import os, uuid, asyncio
+import hashlib
 import requests
 import re
 import json
 from typing import Dict, Optional
 from datetime import datetime
 # Importar servicios de IA
-from services.genScript import extract_text_from_pdf, generate_short_video_script, client, deployment
-from services import genTTS, videoEditor
+from services.genScript import (
+    iter_pdf_page_events, join_pages, infer_target_script_language, agenerate_short_video_script,
+    stream_short_video_script, get_async_client, summarize_llm_usage,
+    get_client, deployment, scan_chars
+)
+from services.language import LANGUAGE_SAMPLE_CHARS
+from services import genTTS, videoEditor, ocr
 from utils.azure_blob import upload_to_blob
+from utils.deadline import Deadline, DeadlineExceeded, timeout_for
+from utils import hedging, metrics, pdf_text_cache, providers, script_cache
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, Response
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pathlib import Path
 
 # Raiz del backend (funciona en local, Linux y Render; no usar rutas absolutas de otra maquina)
@@ -80,6 +88,228 @@ def save_jobs(jobs_dict: Dict[str, Dict], force: bool = False):
 jobs: Dict[str, Dict] = load_jobs()
 print(f"📦 Jobs cargados al iniciar: {len(jobs)}")
 
+# ============================================================================
+# IDEMPOTENCIA DE /generate/video (header Idempotency-Key)
+# ============================================================================
+# El frontend reintenta ante fallos de red y los usuarios hacen doble click.
+# Si llega la misma Idempotency-Key dentro de la ventana, se devuelve el job_id
+# y la respuesta original en lugar de volver a pagar blob + LLM + TTS + render.
+# La relacion clave -> job se guarda en el propio job (jobs_state.json).
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+
+# Indice en memoria clave -> job_id (se reconstruye desde los jobs persistidos)
+idempotency_index: Dict[str, str] = {
+    job["idempotency_key"]: job_id
+    for job_id, job in jobs.items()
+    if job.get("idempotency_key")
+}
+
+# Peticiones con clave que aun no terminan: los duplicados esperan su respuesta
+_idempotency_pending: Dict[str, asyncio.Future] = {}
+
+
+def get_idempotent_response(key: str) -> Optional[Dict]:
+    """
+    Busca la respuesta original asociada a una Idempotency-Key.
+
+    Retorna:
+        Dict | None: Copia de la respuesta original (con el estado actual del job)
+                     o None si la clave no existe o su ventana ya expiro
+    """
+    job_id = idempotency_index.get(key)
+    job = jobs.get(job_id) if job_id else None
+    if not job or not job.get("response"):
+        return None
+
+    try:
+        age = (datetime.now() - datetime.fromisoformat(job["created_at"])).total_seconds()
+    except Exception:
+        age = float("inf")
+    if age > IDEMPOTENCY_TTL_SECONDS:
+        idempotency_index.pop(key, None)
+        return None
+
+    replay = dict(job["response"])
+    replay["status"] = job.get("status", replay.get("status"))
+    replay["idempotent_replay"] = True
+    return replay
+
+# ============================================================================
+# REUSO DE RESULTADOS POR CONTENIDO (PDF + INSTRUCCIONES + VERSION DEL PIPELINE)
+# ============================================================================
+# Los mismos PDFs de clase se suben una y otra vez. Cada envio se identifica por
+# una huella: SHA-256 del PDF + instrucciones normalizadas + version del pipeline.
+# Si ya existe un job completado con la misma huella, se devuelve su resultado
+# (script, audio y video) al instante. force_regenerate=true desactiva el reuso.
+# PIPELINE_CONFIG_VERSION: cambiarla invalida todos los resultados anteriores
+PIPELINE_CONFIG_VERSION = os.getenv("PIPELINE_CONFIG_VERSION", "1")
+# Las URLs SAS de Azure expiran a los 30 dias: no reusar resultados mas viejos
+RESULT_REUSE_MAX_AGE_DAYS = int(os.getenv("RESULT_REUSE_MAX_AGE_DAYS", "25"))
+
+
+def normalize_user_input(user_additional_input: Optional[str]) -> str:
+    """Normaliza las instrucciones del usuario (minusculas y espacios colapsados)."""
+    return script_cache.normalize_instructions(user_additional_input)
+
+
+# ============================================================================
+# INGESTA DE ARCHIVOS SUBIDOS (STREAMING, LIMITE DE TAMANO Y HASH AL VUELO)
+# ============================================================================
+# La copia del archivo subido se ejecuta en un thread para no bloquear el event
+# loop, se aborta en cuanto supera MAX_UPLOAD_MB y calcula el SHA-256 durante la
+# misma pasada (sin volver a leer el archivo para deduplicar o cachear).
+#
+# OJO: cuando la ruta recibe el UploadFile, Starlette ya leyo todo el multipart y
+# lo dejo en un archivo temporal, asi que ese limite no evita recibir el cuerpo.
+# El corte temprano lo hace limit_upload_size con el header Content-Length (antes
+# de leer el cuerpo); una subida sin Content-Length (chunked) solo se corta en la copia.
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Margen para los campos del formulario y los separadores del multipart
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """El archivo subido supera MAX_UPLOAD_MB."""
+
+
+def _copy_upload_with_hash(source, dest_path: str, max_bytes: int) -> tuple[int, str]:
+    """
+    Copia un archivo subido a disco por bloques calculando su SHA-256.
+
+    Parametros:
+        source: Objeto tipo archivo (UploadFile.file)
+        dest_path (str): Ruta local de destino
+        max_bytes (int): Tamano maximo permitido (0 = sin limite)
+
+    Retorna:
+        tuple[int, str]: (bytes escritos, sha256 hexadecimal)
+
+    Lanza:
+        UploadTooLargeError: Si el archivo supera max_bytes (el archivo parcial se borra)
+    """
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(dest_path, "wb") as f:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise UploadTooLargeError(
+                        f"File exceeds the maximum upload size of {MAX_UPLOAD_MB:g} MB."
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return written, digest.hexdigest()
+
+
+async def save_upload(file: UploadFile, dest_path: str) -> tuple[int, str]:
+    """
+    Guarda un UploadFile en disco fuera del event loop (ver _copy_upload_with_hash).
+
+    Lanza:
+        HTTPException(413): Si el archivo supera MAX_UPLOAD_MB
+    """
+    # Rechazo temprano si el tamano ya se conoce (no se copia nada)
+    if MAX_UPLOAD_BYTES and file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the maximum upload size of {MAX_UPLOAD_MB:g} MB."
+        )
+    try:
+        return await asyncio.to_thread(_copy_upload_with_hash, file.file, dest_path, MAX_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Responde 413 antes de leer el cuerpo si el Content-Length ya supera MAX_UPLOAD_MB."""
+    if MAX_UPLOAD_BYTES and request.method == "POST" and request.url.path == "/generate/video":
+        try:
+            content_length = int(request.headers.get("content-length", "0"))
+        except ValueError:
+            content_length = 0
+        if content_length > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File exceeds the maximum upload size of {MAX_UPLOAD_MB:g} MB."},
+            )
+    return await call_next(request)
+
+
+def compute_submission_fingerprint(pdf_sha256: Optional[str], user_additional_input: Optional[str]) -> str:
+    """
+    Huella de un envio: hash del PDF, instrucciones normalizadas y version del pipeline.
+
+    Parametros:
+        pdf_sha256 (str | None): SHA-256 del PDF (None si es un envio solo con tema)
+        user_additional_input (str | None): Instrucciones del usuario
+
+    Retorna:
+        str: SHA-256 hexadecimal que identifica el envio
+    """
+    payload = json.dumps(
+        {
+            "pdf": pdf_sha256 or "",
+            "input": normalize_user_input(user_additional_input),
+            "pipeline": PIPELINE_CONFIG_VERSION,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_reusable_job(job: Dict) -> bool:
+    """Un job es reusable si se completo con video y sus URLs SAS siguen vigentes."""
+    result = job.get("result") or {}
+    if job.get("status") != "completed" or not result.get("video_url"):
+        return False
+    try:
+        completed_at = datetime.fromisoformat(job.get("completed_at") or job["created_at"])
+    except Exception:
+        return False
+    return (datetime.now() - completed_at).days < RESULT_REUSE_MAX_AGE_DAYS
+
+
+# Indice en memoria huella -> job_id completado (se reconstruye desde los jobs persistidos)
+fingerprint_index: Dict[str, str] = {
+    job["fingerprint"]: job_id
+    for job_id, job in jobs.items()
+    if job.get("fingerprint") and _is_reusable_job(job)
+}
+
+
+def find_reusable_result(fingerprint: str) -> Optional[Dict]:
+    """
+    Busca un job completado con la misma huella.
+
+    Retorna:
+        Dict | None: Respuesta lista para el cliente con el resultado del job previo
+    """
+    job_id = fingerprint_index.get(fingerprint)
+    job = jobs.get(job_id) if job_id else None
+    if not job or not _is_reusable_job(job):
+        fingerprint_index.pop(fingerprint, None)
+        return None
+
+    response = dict(job["result"])
+    response.update({
+        "job_id": job_id,
+        "status": "completed",
+        "message": "♻️ Resultado reutilizado de un video generado previamente.",
+        "reused_from_job": job_id,
+    })
+    return response
+
 def update_job(job_id: str, updates: Dict, force_save: bool = False):
     """Actualiza un job y guarda el estado en el archivo (con throttling)"""
     if job_id not in jobs:
@@ -145,6 +375,17 @@ def health():
 def health_head():
     return Response(status_code=200)
 
+
+@app.get("/metrics")
+def get_metrics():
+    """Metricas del proceso (caches, latencias) desde el ultimo arranque."""
+    return {
+        **metrics.snapshot(),
+        "pdf_text_cache": pdf_text_cache.stats(),
+        "script_cache": script_cache.stats(),
+        "llm_hedging": hedging.stats(),
+    }
+
 # Videos servidos por /api/local-video/{filename} (OUTPUT_VIDEOS_DIR opcional en Render)
 _videos_dir_env = os.getenv("OUTPUT_VIDEOS_DIR", "").strip()
 BASE_DIR = (
@@ -190,11 +431,14 @@ def convert_google_drive_link(url: str) -> str:
     
     return url
 
-async def get_base_video() -> str:
+async def get_base_video(timeout: float = 600) -> str:
     """
     Obtiene la ruta del video base. Si no existe localmente, lo descarga desde una URL.
     Soporta links de Google Drive y Azure Blob Storage.
     
+    Parametros:
+        timeout (float): Timeout de la descarga en segundos (por defecto 600)
+    
     Retorna:
         str: Ruta local del video base
     
@@ -246,7 +490,7 @@ async def get_base_video() -> str:
         
         # Para Google Drive, usar sesión para manejar cookies y redirecciones
         session = requests.Session()
-        response = session.get(video_url, stream=True, timeout=600, headers=headers, allow_redirects=True)
+        response = session.get(video_url, stream=True, timeout=timeout, headers=headers, allow_redirects=True)
         response.raise_for_status()
         
         # Verificar si es HTML (página de error de Google Drive)
@@ -418,12 +662,15 @@ async def process_video_generation(
     script: str,
     audio_path: str,
     audio_url: str,
-    language: str
+    language: str,
+    deadline_at: Optional[float] = None
 ):
     """
     Funcion que ejecuta la generacion de video en background.
     Actualiza el estado del job mientras procesa.
+    Si se recibe deadline_at (epoch), cada etapa se abandona si ya no cabe en el tiempo.
     """
+    deadline = Deadline(deadline_at) if deadline_at else None
     try:
         update_job(job_id, {
             "status": "processing",
@@ -432,7 +679,7 @@ async def process_video_generation(
         
         # Obtener ruta del video base
         try:
-            base_video = await get_base_video()
+            base_video = await get_base_video(timeout=timeout_for(deadline, 600, "base_video"))
         except FileNotFoundError as e:
             error_msg = f"Error al obtener video base: {str(e)}"
             print(f"❌ {error_msg}")
@@ -466,7 +713,9 @@ async def process_video_generation(
         def render_video():
             try:
                 print(f"   🎬 Iniciando videoEditor.videoEditor()...")
-                result = videoEditor.videoEditor(base_video, audio_path, language, output_path=final_video_path)
+                result = videoEditor.videoEditor(
+                    base_video, audio_path, language, output_path=final_video_path, deadline=deadline
+                )
                 print(f"   ✅ videoEditor completado")
                 return result
             except Exception as e:
@@ -490,7 +739,11 @@ async def process_video_generation(
         
         update_job(job_id, {"message": "⬆️ Subiendo video a Azure Blob Storage..."})
         print(f"⬆️ Uploading video to blob storage...")
-        video_url = await upload_to_blob(final_video_burned_path, f"videos/{file_id}_final_video_{language}.mp4")
+        video_url = await upload_to_blob(
+            final_video_burned_path,
+            f"videos/{file_id}_final_video_{language}.mp4",
+            timeout=timeout_for(deadline, None, "video_upload")
+        )
         print(f"✅ Video uploaded: {video_url}")
         
         # Actualizar job con resultados
@@ -511,8 +764,14 @@ async def process_video_generation(
             "result": result,
             "completed_at": datetime.now().isoformat()
         }, force_save=True)  # Forzar guardado al completar
+
+        fingerprint = jobs[job_id].get("fingerprint")
+        if fingerprint:
+            fingerprint_index[fingerprint] = job_id
         
     except Exception as video_error:
+        if isinstance(video_error, DeadlineExceeded):
+            print(f"⌛ Job {job_id} abandonado: {video_error}")
         print(f"❌ Error durante generacion de video: {video_error}")
         import traceback
         traceback.print_exc()
@@ -535,11 +794,276 @@ async def process_video_generation(
             "result": result
         }, force_save=True)  # Forzar guardado al error
 
+# ============================================================================
+# CICLO DE VIDA DE LOS JOBS: APAGADO ORDENADO Y REANUDACION
+# ============================================================================
+# En un redeploy de Render, uvicorn se detiene y los renders en curso morian a la
+# mitad, dejando jobs en "processing" para siempre. Ahora:
+# - Al apagar: uvicorn ya dejo de aceptar conexiones antes del hook de shutdown, asi
+#   que no llegan trabajos nuevos. Se espera hasta SHUTDOWN_GRACE_SECONDS a que
+#   terminen las peticiones /generate/video en curso (subida, extraccion, guion,
+#   audio; se registran desde que se aceptan) y los renders que lanzan. Los renders
+#   que no terminan quedan como "interrupted" (reanudables) y se fuerza un save_jobs final.
+# - Al arrancar: los jobs reanudables (con checkpoint) vuelven a ejecutarse con
+#   un presupuesto de tiempo nuevo (RESUME_DEADLINE_SECONDS): el deadline original
+#   casi siempre vencio durante el reinicio y el render ya no depende de la peticion.
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "25"))
+# Presupuesto total de un job: el frontend deja de hacer polling a los 10 minutos
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "600"))
+RESUME_MAX_AGE_HOURS = float(os.getenv("RESUME_MAX_AGE_HOURS", "24"))
+# Presupuesto del render + subida de un job reanudado (cuenta desde el arranque)
+RESUME_DEADLINE_SECONDS = float(os.getenv("RESUME_DEADLINE_SECONDS", str(JOB_DEADLINE_SECONDS)))
+# STREAMING_TTS=1: el guion se genera en streaming y cada oracion se sintetiza en
+# cuanto termina (el TTS se solapa con el LLM; el audio queda en WAV)
+STREAMING_TTS = os.getenv("STREAMING_TTS", "0") == "1"
+
+# Peticiones /generate/video en curso (fase de la peticion, antes del render)
+_active_requests: set = set()
+# Tareas de generacion de video en curso (job_id -> tarea asyncio)
+_active_tasks: Dict[str, asyncio.Task] = {}
+
+
+def start_video_job(job_id: str, checkpoint: Dict) -> asyncio.Task:
+    """Lanza process_video_generation como tarea rastreada (para poder drenarla al apagar)."""
+    task = asyncio.create_task(process_video_generation(job_id=job_id, **checkpoint))
+    _active_tasks[job_id] = task
+
+    def _forget(t: asyncio.Task):
+        if _active_tasks.get(job_id) is t:
+            _active_tasks.pop(job_id, None)
+
+    task.add_done_callback(_forget)
+    return task
+
+
+def _download_file(url: str, dest_path: str) -> None:
+    """Descarga un archivo (ej. audio en Blob Storage) a una ruta local."""
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with requests.get(url, stream=True, timeout=120) as response:
+        response.raise_for_status()
+        with open(dest_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                if chunk:
+                    f.write(chunk)
+
+
+@app.on_event("startup")
+async def warm_up_providers():
+    """
+    Crea los clientes de Azure OpenAI, Blob Storage y AssemblyAI en segundo plano si
+    PROVIDERS_WARMUP=1. Por defecto no: importar los SDKs al arrancar anula la carga
+    perezosa que acelera el arranque en frio (ej: plan gratuito de Render).
+    """
+    if providers.PROVIDERS_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, providers.warm_up)
+
+
+@app.on_event("startup")
+async def resume_interrupted_jobs():
+    """Reanuda los jobs que quedaron a medias por un reinicio (si tienen checkpoint)."""
+    resumed = 0
+    for job_id, job in list(jobs.items()):
+        if job.get("status") not in ("processing", "interrupted"):
+            continue
+
+        checkpoint = job.get("checkpoint")
+        try:
+            age_hours = (datetime.now() - datetime.fromisoformat(job["created_at"])).total_seconds() / 3600
+        except Exception:
+            age_hours = float("inf")
+
+        if not checkpoint or age_hours > RESUME_MAX_AGE_HOURS:
+            update_job(job_id, {
+                "status": "error",
+                "message": "❌ Error: El servidor se reinicio durante la generacion.",
+                "error": "Job interrupted by a server restart and cannot be resumed."
+            })
+            continue
+
+        try:
+            # El disco de Render es efimero: recuperar el audio desde Blob Storage
+            if not os.path.exists(checkpoint["audio_path"]):
+                await asyncio.to_thread(_download_file, checkpoint["audio_url"], checkpoint["audio_path"])
+        except Exception as e:
+            update_job(job_id, {
+                "status": "error",
+                "message": f"❌ Error: No se pudo reanudar el job: {e}",
+                "error": str(e)
+            })
+            continue
+
+        # Presupuesto nuevo: el tiempo del reinicio no cuenta contra el job
+        checkpoint = dict(checkpoint, deadline_at=Deadline.after(RESUME_DEADLINE_SECONDS).expires_at)
+        update_job(job_id, {
+            "status": "processing",
+            "message": "🔁 Reanudando generacion de video tras reinicio...",
+            "checkpoint": checkpoint
+        })
+        start_video_job(job_id, checkpoint)
+        resumed += 1
+
+    save_jobs(jobs, force=True)
+    if resumed:
+        print(f"🔁 Jobs reanudados al iniciar: {resumed}")
+
+
+@app.on_event("shutdown")
+async def drain_jobs_on_shutdown():
+    """Espera a las peticiones y jobs activos hasta SHUTDOWN_GRACE_SECONDS en total."""
+    loop = asyncio.get_running_loop()
+    grace_ends = loop.time() + SHUTDOWN_GRACE_SECONDS
+
+    # Primero las peticiones en curso: al terminar pueden lanzar su render
+    requests_pending = [t for t in _active_requests if not t.done()]
+    if requests_pending:
+        print(f"⏳ Apagando: esperando {len(requests_pending)} peticion(es) en curso (max {SHUTDOWN_GRACE_SECONDS:g}s)...")
+        await asyncio.wait(requests_pending, timeout=SHUTDOWN_GRACE_SECONDS)
+
+    pending = [t for t in _active_tasks.values() if not t.done()]
+    if pending:
+        print(f"⏳ Apagando: esperando {len(pending)} job(s) activos (max {SHUTDOWN_GRACE_SECONDS:g}s)...")
+        await asyncio.wait(pending, timeout=max(0, grace_ends - loop.time()))
+
+    # Lo que no termino a tiempo queda como reanudable para el siguiente arranque
+    for job_id, task in list(_active_tasks.items()):
+        if task.done():
+            continue
+        task.cancel()
+        update_job(job_id, {
+            "status": "interrupted",
+            "message": "⏸️ Generacion interrumpida por reinicio del servidor; se reanudara automaticamente."
+        })
+        print(f"⏸️ Job {job_id} marcado como reanudable")
+
+    save_jobs(jobs, force=True)
+    ocr.shutdown_ocr_pool()
+    await providers.aclose_all()
+
+
+async def extract_pdf_with_progress(
+    job_id: str,
+    pdf_path: str,
+    pdf_sha256: Optional[str],
+    user_additional_input: str
+) -> tuple[str, "asyncio.Task[str]"]:
+    """
+    Extrae el texto del PDF pagina por pagina reportando el progreso en el job.
+
+    En cuanto hay LANGUAGE_SAMPLE_CHARS caracteres (o termina la extraccion) se lanza
+    la inferencia del idioma del guion, sin esperar al resto de las paginas.
+
+    Retorna:
+        tuple[str, Task]: Texto extraido y la tarea que resuelve el idioma del guion
+    """
+    loop = asyncio.get_running_loop()
+    parts: list[str] = []
+    language_task: Optional[asyncio.Task] = None
+
+    def start_language_inference() -> None:
+        nonlocal language_task
+        if language_task is None:
+            sample = "\n\n".join(part for part in parts if part)
+            language_task = asyncio.create_task(
+                asyncio.to_thread(infer_target_script_language, sample, user_additional_input)
+            )
+
+    def on_page(event: Dict) -> None:
+        # Corre en el event loop (llamado desde el hilo de extraccion). Las paginas
+        # vacias tambien se guardan: join_pages usa el indice de cada pagina
+        parts.append(event["text"])
+        metrics.observe(f"pdf_extraction.page_seconds.{event['source']}", event["elapsed"])
+        total = f"/{event['page_count']}" if event.get("page_count") else ""
+        origin = "cache" if event["cached"] else ("OCR" if event["source"] == "ocr" else "texto")
+        update_job(job_id, {
+            "message": f"📄 Extrayendo texto del PDF: pagina {event['page'] + 1}{total} ({origin})...",
+            "extraction": {
+                "pages_done": event["page"] + 1,
+                "page_count": event.get("page_count"),
+                "chars": event["chars"],
+                "ocr_lang": event.get("ocr_lang"),
+            }
+        })
+        if event["chars"] >= LANGUAGE_SAMPLE_CHARS:
+            start_language_inference()
+
+    def run() -> None:
+        for event in iter_pdf_page_events(pdf_path, pdf_sha256, scan_chars()):
+            loop.call_soon_threadsafe(on_page, event)
+
+    try:
+        # call_soon_threadsafe es FIFO: al volver to_thread ya se procesaron todos los eventos
+        await asyncio.to_thread(run)
+    except BaseException:
+        # Si la extraccion falla, la inferencia del idioma ya lanzada no se esperara nunca
+        if language_task is not None:
+            language_task.cancel()
+            if language_task.done() and not language_task.cancelled():
+                language_task.exception()  # Marcar como leida
+        raise
+    start_language_inference()
+    return join_pages(parts), language_task
+
+
+async def stream_script_chunks(
+    pdf_text: str,
+    user_additional_input: str,
+    target_lang: Optional[str],
+    deadline: Deadline,
+    use_cache: bool = True,
+    usage_log: Optional[list] = None
+):
+    """
+    Fragmentos del guion en streaming (ver stream_short_video_script) como iterador
+    asincrono: el LLM se consume en un hilo y cada fragmento pasa al event loop.
+    Si el consumidor se detiene (error, timeout o cancelacion), el hilo corta el
+    streaming del LLM en el siguiente evento.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> None:
+        if not stop.is_set():
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def produce() -> None:
+        chunks = stream_short_video_script(
+            pdf_text, get_client(), deployment,
+            user_additional_input=user_additional_input, deadline=deadline, target_lang=target_lang,
+            use_cache=use_cache, usage_log=usage_log, stop=stop
+        )
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                put(chunk)
+        except Exception as e:
+            put(e)
+        finally:
+            chunks.close()  # Cierra el stream del LLM si no termino
+            put(done)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await producer
+    finally:
+        stop.set()
+
+
 @app.post("/generate/video")
 async def generate_video(
-    background_tasks: BackgroundTasks,
     file: UploadFile | None = File(None), 
-    user_additional_input: str = Form(...)
+    user_additional_input: str = Form(...),
+    force_regenerate: bool = Form(False),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     AGENTE INTELIGENTE: Orquesta el pipeline completo de generacion de video usando IA.
@@ -560,7 +1084,89 @@ async def generate_video(
     4. Genera audio usando TTS (IA)
     5. Edita video (NO es IA, es procesamiento de video)
     6. Retorna resultados
+
+    IDEMPOTENCIA: Si el cliente envia el header Idempotency-Key, una repeticion
+    con la misma clave (dentro de IDEMPOTENCY_TTL_SECONDS) devuelve el job_id y la
+    respuesta originales. Si la primera peticion sigue en curso, la repeticion
+    espera a que termine y devuelve su misma respuesta (o el mismo error HTTP).
+
+    La peticion se registra desde que se acepta, para que el apagado ordenado
+    (drain_jobs_on_shutdown) la espere aunque aun no haya lanzado el render.
+
+    REUSO POR CONTENIDO: Si el mismo PDF con las mismas instrucciones ya se proceso
+    con la version actual del pipeline, se devuelve ese resultado al instante.
+    Enviar force_regenerate=true para generar un video nuevo de todas formas.
+    """
+    task = asyncio.current_task()
+    _active_requests.add(task)
+    try:
+        return await _generate_video_idempotent(
+            file, user_additional_input, force_regenerate, idempotency_key
+        )
+    finally:
+        _active_requests.discard(task)
+
+
+async def _generate_video_idempotent(
+    file: UploadFile | None,
+    user_additional_input: str,
+    force_regenerate: bool,
+    idempotency_key: Optional[str]
+) -> Dict:
+    """Aplica el Idempotency-Key (ver generate_video) y ejecuta _run_generate_video."""
+    key = (idempotency_key or "").strip() or None
+    if not key:
+        return await _run_generate_video(
+            file, user_additional_input, force_regenerate=force_regenerate
+        )
+
+    replay = get_idempotent_response(key)
+    if replay is not None:
+        print(f"🔁 Idempotency-Key repetida, devolviendo job existente: {replay.get('job_id')}")
+        return replay
+
+    pending = _idempotency_pending.get(key)
+    if pending is not None:
+        print(f"⏳ Idempotency-Key en curso, esperando la peticion original...")
+        original = await asyncio.shield(pending)
+        return dict(original, idempotent_replay=True)
+
+    pending = asyncio.get_running_loop().create_future()
+    _idempotency_pending[key] = pending
+    response: Dict = {"error": "Server error: the original request was interrupted."}
+    try:
+        response = await _run_generate_video(
+            file, user_additional_input,
+            force_regenerate=force_regenerate, idempotency_key=key
+        )
+        return response
+    except HTTPException as e:
+        # Los duplicados reciben el mismo status y detalle (400, 413...)
+        pending.set_exception(e)
+        pending.exception()  # Marcar como leida aunque no haya duplicados esperando
+        raise
+    finally:
+        _idempotency_pending.pop(key, None)
+        if not pending.done():
+            pending.set_result(response)
+
+
+async def _run_generate_video(
+    file: UploadFile | None,
+    user_additional_input: str,
+    force_regenerate: bool = False,
+    idempotency_key: Optional[str] = None
+) -> Dict:
+    """
+    Ejecuta el pipeline de /generate/video (ver generate_video).
+    Si se recibe idempotency_key, la respuesta se guarda en el job para reusarla.
+    Si force_regenerate es False, reusa el resultado de un envio identico previo.
+
+    Todo el job (esta peticion + el render en background) comparte un deadline de
+    JOB_DEADLINE_SECONDS; cada etapa lo revisa y recibe el tiempo restante como timeout.
     """
+    deadline = Deadline.after(JOB_DEADLINE_SECONDS)
+    job_id = None
     try:
         # ====================================================================
         # PASO 1: Guardar PDF localmente (si se proporciono)
@@ -573,28 +1179,52 @@ async def generate_video(
         if file is not None:
             file_id = f"{base_id}_{file.filename}"
             local_path = os.path.join("photos", file_id)
-            with open(local_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
+            upload_size, pdf_sha256 = await save_upload(file, local_path)
+            print(f"📥 PDF recibido: {upload_size / (1024*1024):.2f} MB (sha256 {pdf_sha256[:12]}...)")
         else:
             file_id = base_id
+            pdf_sha256 = None
+
+        # Reusar el resultado de un envio identico (mismo PDF + instrucciones)
+        fingerprint = compute_submission_fingerprint(pdf_sha256, user_additional_input)
+        if not force_regenerate:
+            reused = find_reusable_result(fingerprint)
+            if reused is not None:
+                print(f"♻️ Envio identico a job {reused['job_id']}, reutilizando resultado")
+                if local_path and os.path.exists(local_path):
+                    os.remove(local_path)
+                return reused
+
+        # El job se registra desde ya para reportar el progreso de cada etapa
+        job_id = str(uuid.uuid4())
+        update_job(job_id, {"status": "processing", "message": "📥 Preparando generacion..."})
 
         # ====================================================================
         # PASO 2: Subir PDF a Azure Blob Storage (almacenamiento)
         # ====================================================================
         if local_path:
             try:
-                blob_url = await upload_to_blob(local_path, f"files/{file_id}")
+                blob_url = await upload_to_blob(
+                    local_path, f"files/{file_id}", timeout=deadline.timeout(stage="pdf_upload")
+                )
             except Exception as e:
-                return {"error": f"Failed to upload PDF to blob: {str(e)}", "pdf_name": file_id}
+                return _fail_job(job_id, {"error": f"Failed to upload PDF to blob: {str(e)}", "pdf_name": file_id})
 
         # ====================================================================
         # PASO 3: EXTRAER TEXTO DEL PDF USANDO NLP + OCR (IA)
         # Relacion: IA_Clase_02, IA_Clase_06
         # ====================================================================
+        target_lang = None
         if local_path:
             # Esta funcion usa procesamiento de lenguaje natural (NLP)
             # Si el PDF esta escaneado, usa OCR (Reconocimiento Optico de Caracteres)
-            pdf_text = await asyncio.to_thread(extract_text_from_pdf, local_path)
+            deadline.check("pdf_extraction")
+            # Solo se extrae hasta scan_chars() (EXCERPT_SCAN_CHARS, o mas con el modo documento
+            # largo); el progreso por pagina queda en el job y el idioma se infiere en paralelo
+            pdf_text, language_task = await extract_pdf_with_progress(
+                job_id, local_path, pdf_sha256, user_additional_input
+            )
+            target_lang = await language_task
 
         # ====================================================================
         # PASO 4: GENERAR GUION USANDO MODELO DE LENGUAJE (LLM) - IA
@@ -602,59 +1232,97 @@ async def generate_video(
         # ====================================================================
         # Esta es una llamada a un MODELO DE LENGUAJE GRANDE (LLM)
         # El modelo GPT procesa el texto del PDF y genera un guion creativo
-        script = await asyncio.to_thread(
-            generate_short_video_script,
-            pdf_text,
-            client,
-            deployment,
-            user_additional_input=user_additional_input
-        )
-        if not script.strip():
+        def empty_script_response() -> Dict:
             resp = {"error": "Generated script is empty."}
             if local_path:
                 resp.update({"pdf_name": file_id, "blob_url": blob_url})
             else:
                 resp.update({"topic": user_additional_input})
-            return resp
+            return _fail_job(job_id, resp)
 
-        # ====================================================================
-        # PASO 5: GENERAR AUDIO USANDO TEXT-TO-SPEECH (TTS) - IA
-        # Relacion: IA_Clase_02, IA_Clase_05
-        # ====================================================================
-        # Esta es una llamada a un servicio de TTS (Sintesis de Voz)
-        # Convierte el texto del guion en audio de voz humana sintetica
         os.makedirs("output/audio", exist_ok=True)
-        audio_path = f"output/audio/{file_id}.mp3"
-        audio_path, language = await genTTS.generate_tts(script, gender="male", output_path=audio_path)
-        audio_url = await upload_to_blob(audio_path, f"audio/{file_id}_{language}.mp3")
+        # Tokens, modelo y latencia de cada llamada al LLM de este job (costo por video)
+        llm_usage: list = []
+        if STREAMING_TTS:
+            # PASO 4 + PASO 5 SOLAPADOS: cada oracion del guion va al TTS en cuanto
+            # el LLM la termina (ver genTTS.generate_tts_streaming)
+            update_job(job_id, {"message": "🖊️ Generando guion y audio..."})
+            audio_path, language, script = await genTTS.generate_tts_streaming(
+                stream_script_chunks(
+                    pdf_text, user_additional_input, target_lang, deadline,
+                    use_cache=not force_regenerate,
+                    usage_log=llm_usage
+                ),
+                gender="male",
+                output_path=f"output/audio/{file_id}.wav",
+                timeout=deadline.timeout(stage="tts")
+            )
+            update_job(job_id, {"llm": summarize_llm_usage(llm_usage)})
+            if not script.strip():
+                return empty_script_response()
+        else:
+            update_job(job_id, {"message": "🖊️ Generando guion..."})
+            script = await agenerate_short_video_script(
+                pdf_text,
+                get_async_client(),
+                deployment,
+                user_additional_input=user_additional_input,
+                # Cada llamada al LLM (resumenes y guion) recibe el tiempo que queda
+                deadline=deadline,
+                target_lang=target_lang,
+                use_cache=not force_regenerate,
+                usage_log=llm_usage
+            )
+            update_job(job_id, {"llm": summarize_llm_usage(llm_usage)})
+            if not script.strip():
+                return empty_script_response()
+
+            # ================================================================
+            # PASO 5: GENERAR AUDIO USANDO TEXT-TO-SPEECH (TTS) - IA
+            # Relacion: IA_Clase_02, IA_Clase_05
+            # ================================================================
+            # Esta es una llamada a un servicio de TTS (Sintesis de Voz)
+            # Convierte el texto del guion en audio de voz humana sintetica
+            update_job(job_id, {"message": "🎙️ Generando audio..."})
+            audio_path, language = await genTTS.generate_tts(
+                script, gender="male", output_path=f"output/audio/{file_id}.mp3",
+                timeout=deadline.timeout(stage="tts")
+            )
+        audio_ext = os.path.splitext(audio_path)[1]
+        audio_url = await upload_to_blob(
+            audio_path, f"audio/{file_id}_{language}{audio_ext}", timeout=deadline.timeout(stage="audio_upload")
+        )
 
         # ====================================================================
-        # PASO 6: CREAR JOB Y RETORNAR INMEDIATAMENTE
+        # PASO 6: LANZAR EL RENDER Y RETORNAR INMEDIATAMENTE
         # ====================================================================
         # Para evitar timeout de Render, retornamos inmediatamente
         # y ejecutamos la generacion de video en background
-        job_id = str(uuid.uuid4())
+        # El checkpoint guarda todo lo necesario para reanudar el render si el
+        # servidor se reinicia (ver resume_interrupted_jobs)
+        checkpoint = {
+            "file_id": file_id,
+            "local_path": local_path,
+            "blob_url": blob_url,
+            "user_additional_input": user_additional_input,
+            "script": script,
+            "audio_path": audio_path,
+            "audio_url": audio_url,
+            "language": language,
+            "deadline_at": deadline.expires_at
+        }
         update_job(job_id, {
             "status": "processing",
             "message": "🎬 Generando video en background...",
             "script": script,
             "audio_url": audio_url,
-            "video_url": None
-        })
+            "video_url": None,
+            "fingerprint": fingerprint,
+            "checkpoint": checkpoint
+        }, force_save=True)
         
         # Ejecutar generacion de video en background
-        background_tasks.add_task(
-            process_video_generation,
-            job_id=job_id,
-            file_id=file_id,
-            local_path=local_path,
-            blob_url=blob_url,
-            user_additional_input=user_additional_input,
-            script=script,
-            audio_path=audio_path,
-            audio_url=audio_url,
-            language=language
-        )
+        start_video_job(job_id, checkpoint)
         
         # Retornar inmediatamente con job_id y resultados parciales
         result = {
@@ -675,14 +1343,36 @@ async def generate_video(
                 "topic": user_additional_input
             })
         
+        if idempotency_key:
+            # Guardar clave -> job y la respuesta original en el job store
+            update_job(job_id, {
+                "idempotency_key": idempotency_key,
+                "response": result
+            }, force_save=True)
+            idempotency_index[idempotency_key] = job_id
+
         print(f"📤 Retornando resultados inmediatamente (video en background):")
         print(f"   📝 Script length: {len(script)} caracteres")
         print(f"   🎵 Audio URL: {audio_url}")
         print(f"   🆔 Job ID: {job_id}")
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"error": f"Server error: {str(e)}"}
+        return _fail_job(job_id, {"error": f"Server error: {str(e)}"})
+
+
+def _fail_job(job_id: Optional[str], resp: Dict) -> Dict:
+    """Marca como fallido el job de una peticion (si ya se registro) y retorna la respuesta de error."""
+    if job_id:
+        update_job(job_id, {
+            "status": "error",
+            "message": f"❌ Error: {resp['error']}",
+            "error": resp["error"],
+            "completed_at": datetime.now().isoformat()
+        })
+    return resp
 
 @app.get("/generate/video/status/{job_id}")
 async def get_video_status(job_id: str):
@@ -0,0 +1,192 @@
+# ============================================================================
+# LIMPIEZA DE ENCABEZADOS Y PIES REPETIDOS (PDFs EXPORTADOS DE DIAPOSITIVAS)
+# ============================================================================
+# Los PDFs exportados de PowerPoint repiten en cada pagina el nombre del curso, el
+# texto del logo de la universidad, el numero de diapositiva y el pie de pagina.
+# Antes de elegir el fragmento para el LLM se quitan:
+# - lineas identicas que se repiten en muchas paginas (conteo por hash de la linea normalizada)
+# - primeras/ultimas lineas que solo cambian en el numero de pagina ("Clase 3 - pag. 12"):
+#   solo se unifica un numero al inicio o al final de la linea que sigue la
+#   numeracion de las paginas (asi "Tema 3: agentes" y "Tema 4: agentes" se conservan)
+# - numeros de pagina/diapositiva con etiqueta ("Página 3 de 20", "Slide 4") en la
+#   primera o ultima linea de la pagina
+# - numeros sueltos ("12") en el encabezado/pie solo si siguen la numeracion de las
+#   paginas (asi un "1850" al inicio de una pagina de historia se conserva)
+# - vinietas vacias ("•", "-", "▪" sin texto)
+# ============================================================================
+
+import hashlib
+import os
+import re
+from collections import Counter
+from typing import List
+
+from utils import metrics
+
+# Una linea es repetida si aparece en al menos esta fraccion de las paginas...
+BOILERPLATE_MIN_PAGE_RATIO = float(os.getenv("BOILERPLATE_MIN_PAGE_RATIO", "0.3"))
+# ...y en al menos este numero de paginas
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))
+
+# Numero de pagina con etiqueta ("Página 3 de 20", "Slide 4", "3 / 20")
+_LABELED_PAGE_NUMBER_RE = re.compile(
+    r"^\s*(?:(?:(?:p[áa]g(?:ina)?|page|slide|diapositiva|l[áa]mina)\.?\s*\d{1,4}"
+    r"(?:\s*(?:/|de|of)\s*\d{1,4})?)|\d{1,4}\s*(?:/|de|of)\s*\d{1,4})\s*$",
+    re.IGNORECASE,
+)
+_BARE_NUMBER_RE = re.compile(r"^\s*(\d{1,4})\s*$")
+# Numero al inicio o al final de una linea de encabezado/pie ("12 | Curso", "Clase 3 - pag. 12")
+_EDGE_NUMBER_RE = re.compile(r"^(\d{1,4})\b|\b(\d{1,4})$")
+_EMPTY_BULLET_RE = re.compile(r"^\s*[•●○◦▪■□‣∙·\-–—*>o]\s*$")
+_SPACES_RE = re.compile(r"\s+")
+# Lineas de encabezado/pie de hasta estas palabras se comparan ignorando el numero de pagina
+_SHORT_LINE_WORDS = 6
+# Lineas no vacias del inicio y del final de cada pagina donde se buscan numeros
+# sueltos (PowerPoint exporta el numero de diapositiva antes o despues del titulo)
+_EDGE_LINES = 2
+# Un numero suelto es de pagina si difiere a lo mas en esto de la numeracion
+# detectada (diapositivas ocultas o sin numero desplazan la cuenta)
+_PAGE_NUMBER_TOLERANCE = 2
+
+
+def _normalize(line: str) -> str:
+    return _SPACES_RE.sub(" ", line.strip().lower())
+
+
+def _hash(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _line_key(line: str) -> str:
+    """Hash de la linea normalizada (minusculas y espacios unificados)."""
+    return _hash(_normalize(line))
+
+
+def _follows_numbering(number: int, page_index: int, offset: int | None,
+                       tolerance: int = _PAGE_NUMBER_TOLERANCE) -> bool:
+    return offset is not None and abs(number - page_index - offset) <= tolerance
+
+
+def _edge_key(line: str, page_index: int, offset: int | None) -> str | None:
+    """
+    Hash de la primera/ultima linea de una pagina con el numero de pagina unificado
+    ("Clase 3 - pag. 12" == "Clase 3 - pag. 13"). None si la linea es larga, no
+    tiene letras (los numeros sueltos se tratan aparte) o no tiene un numero que
+    siga la numeracion de las paginas (las lineas identicas ya se cuentan aparte).
+    """
+    normalized = _normalize(line)
+    if len(normalized.split()) > _SHORT_LINE_WORDS or not any(c.isalpha() for c in normalized):
+        return None
+    # Dentro de una linea con texto solo se unifica el numero exacto de la pagina
+    folded = _EDGE_NUMBER_RE.sub(
+        lambda m: "#" if _follows_numbering(int(m.group(1) or m.group(2)), page_index, offset, 0) else m.group(0),
+        normalized,
+    )
+    return _hash(folded) if folded != normalized else None
+
+
+def _edge_indexes(lines: List[str], depth: int) -> set:
+    """Indices de las primeras y ultimas `depth` lineas no vacias de una pagina."""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    return set(non_empty[:depth] + non_empty[-depth:])
+
+
+def _edge_numbers(lines: List[str]) -> List[int]:
+    """
+    Posibles numeros de pagina de una pagina: numeros sueltos en el encabezado/pie
+    y numeros al inicio o al final de la primera y la ultima linea.
+    """
+    numbers = []
+    for i in _edge_indexes(lines, _EDGE_LINES):
+        match = _BARE_NUMBER_RE.match(lines[i])
+        if match:
+            numbers.append(int(match.group(1)))
+    for i in _edge_indexes(lines, 1):
+        numbers.extend(int(a or b) for a, b in _EDGE_NUMBER_RE.findall(_normalize(lines[i])))
+    return numbers
+
+
+def _page_number_offset(page_lines: List[List[str]], threshold: float) -> int | None:
+    """
+    Diferencia mas comun entre el numero impreso y el indice de la pagina (ej: 1 si
+    la pagina de indice 4 dice "5"), si al menos `threshold` paginas tienen en su
+    encabezado/pie un numero que sigue esa numeracion. None si no hay numeracion.
+    """
+    page_offsets = [
+        {number - index for number in _edge_numbers(lines)}
+        for index, lines in enumerate(page_lines)
+    ]
+    offsets = Counter(offset for offsets in page_offsets for offset in offsets)
+    if not offsets:
+        return None
+    offset = offsets.most_common(1)[0][0]
+    following = sum(
+        1 for offsets in page_offsets
+        if any(abs(o - offset) <= _PAGE_NUMBER_TOLERANCE for o in offsets)
+    )
+    return offset if following >= threshold else None
+
+
+def strip_boilerplate(pages: List[str]) -> List[str]:
+    """
+    Quita de cada pagina las lineas repetidas entre paginas, los numeros de pagina y
+    las vinietas vacias.
+
+    Parametros:
+        pages (list[str]): Texto de cada pagina, en orden, incluidas las paginas vacias
+            (el indice de cada pagina se usa para reconocer su numero)
+
+    Retorna:
+        list[str]: Texto limpio de cada pagina (misma cantidad y orden)
+    """
+    if not pages:
+        return pages
+
+    page_lines = [page.splitlines() for page in pages]
+    non_empty_pages = sum(1 for page in pages if page.strip())
+    threshold = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_MIN_PAGE_RATIO * non_empty_pages)
+    offset = _page_number_offset(page_lines, threshold)
+
+    # Cuantas paginas contienen cada linea identica (una vez por pagina) y cada
+    # primera/ultima linea con el numero de pagina unificado
+    frequency = Counter(
+        key for lines in page_lines for key in {_line_key(line) for line in lines if line.strip()}
+    )
+    edge_keys = [
+        {i: _edge_key(lines[i], page_index, offset) for i in _edge_indexes(lines, 1)}
+        for page_index, lines in enumerate(page_lines)
+    ]
+    edge_frequency = Counter(key for keys in edge_keys for key in set(keys.values()) - {None})
+    repeated = {key for key, count in frequency.items() if count >= threshold}
+    repeated_edges = {key for key, count in edge_frequency.items() if count >= threshold}
+
+    def is_page_number(i: int, line: str, page_index: int, edges: set, first_last: set) -> bool:
+        if i in first_last and _LABELED_PAGE_NUMBER_RE.match(line):
+            return True
+        match = _BARE_NUMBER_RE.match(line) if i in edges else None
+        return bool(match) and _follows_numbering(int(match.group(1)), page_index, offset)
+
+    cleaned = []
+    for page_index, lines in enumerate(page_lines):
+        edges = _edge_indexes(lines, _EDGE_LINES)
+        first_last = _edge_indexes(lines, 1)
+        kept = [
+            line for i, line in enumerate(lines)
+            if not _EMPTY_BULLET_RE.match(line)
+            and not is_page_number(i, line, page_index, edges, first_last)
+            and _line_key(line) not in repeated
+            and edge_keys[page_index].get(i) not in repeated_edges
+        ]
+        # Sin lineas en blanco repetidas (los parrafos siguen separados por una)
+        cleaned.append(re.sub(r"\n\s*\n\s*\n+", "\n\n", "\n".join(kept)).strip())
+
+    before = sum(len(page) for page in pages)
+    after = sum(len(page) for page in cleaned)
+    if before:
+        metrics.observe("boilerplate.removed_ratio", 1 - after / before)
+        if after < before:
+            print(
+                f"🧹 Encabezados/pies repetidos eliminados: {before - after} de {before} caracteres "
+                f"({len(repeated) + len(repeated_edges)} linea(s) repetida(s))"
+            )
+    return cleaned
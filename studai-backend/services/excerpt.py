@@ -0,0 +1,184 @@
+# ============================================================================
+# SELECCION DE FRAGMENTOS RELEVANTES DEL PDF (TF-IDF)
+# ============================================================================
+# En lugar de mandar al LLM el inicio del documento (portada e indice en
+# documentos largos), el documento se divide en secciones, cada seccion
+# se representa como vector TF-IDF y se puntua por su similitud coseno con:
+# - el centroide del documento (lo que trata el documento en general)
+# - las instrucciones del usuario (lo que pidio que se cubriera)
+# Las mejores secciones se empaquetan en el presupuesto (caracteres o tokens) y se
+# entregan en el orden original del documento.
+#
+# Las palabras se comparan sin tildes y con una normalizacion ligera de plurales
+# ("agujeros negros" coincide con "agujero negro", "redes" con "red").
+#
+# RELACION CON IA:
+# - IA_Clase_06 (Tokens e incrustaciones): representacion vectorial de texto
+# ============================================================================
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, List
+
+from utils import metrics
+
+# Tamano objetivo de cada seccion (en caracteres)
+EXCERPT_SECTION_CHARS = int(os.getenv("EXCERPT_SECTION_CHARS", "1200"))
+# Peso de la similitud con las instrucciones del usuario frente al centroide
+EXCERPT_INSTRUCTION_WEIGHT = float(os.getenv("EXCERPT_INSTRUCTION_WEIGHT", "1.0"))
+
+_WORD_RE = re.compile(r"[^\W\d_]{3,}")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Las tildes se quitan antes de comparar palabras (la ñ se conserva)
+_ACCENTS = str.maketrans("áéíóúüàèìòùâêîôûäëïö", "aeiouuaeiouaeiouaeio")
+# Consonantes tras las que el plural espanol es "-es" (red/redes, motor/motores);
+# la "e" final tras ellas tambien se quita en singular (table/tables, line/lines)
+_PLURAL_ES_CONSONANTS = frozenset("lrndzj")
+
+# Palabras vacias (espanol + ingles) que no aportan al tema de una seccion
+_STOPWORDS = frozenset("""
+the and for with that this from are was were have has had not but you your can will
+its into than then them they their there these those which what when where who how
+also more most such only other about over under between each been being our out
+los las una unos unas del con por para como mas más que pero sus esta este estos
+estas ese esos esas son ser fue han hay muy sin sobre entre cuando donde también
+tambien porque cada otro otra otros otras desde hasta puede pueden todo todos
+""".translate(_ACCENTS).split())
+
+
+def _stem(word: str) -> str:
+    """Normalizacion ligera de plurales (-s / -es), igual para singular y plural."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    if len(word) > 3 and word.endswith("e") and word[-2] in _PLURAL_ES_CONSONANTS:
+        word = word[:-1]
+    return word
+
+
+def _tokens(text: str) -> List[str]:
+    words = _WORD_RE.findall(text.lower().translate(_ACCENTS))
+    return [_stem(w) for w in words if w not in _STOPWORDS]
+
+
+def split_sections(text: str, section_chars: int = EXCERPT_SECTION_CHARS) -> List[str]:
+    """
+    Divide el texto en secciones de ~section_chars caracteres respetando parrafos
+    (y oraciones cuando un parrafo es demasiado largo).
+    """
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= section_chars:
+            pieces.append(paragraph)
+            continue
+        # Parrafo largo: cortar por oraciones (y a la fuerza si no hay puntos)
+        current = ""
+        for sentence in _SENTENCE_END_RE.split(paragraph):
+            while len(sentence) > section_chars:
+                pieces.append(sentence[:section_chars])
+                sentence = sentence[section_chars:]
+            if current and len(current) + len(sentence) + 1 > section_chars:
+                pieces.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+        if current:
+            pieces.append(current)
+
+    # Juntar piezas pequenas consecutivas hasta el tamano objetivo
+    sections: List[str] = []
+    for piece in pieces:
+        if sections and len(sections[-1]) + len(piece) + 2 <= section_chars:
+            sections[-1] = f"{sections[-1]}\n\n{piece}"
+        else:
+            sections.append(piece)
+    return sections
+
+
+def _tfidf_vectors(docs: List[List[str]], idf: Dict[str, float]) -> List[Dict[str, float]]:
+    """Vectores TF-IDF dispersos y normalizados (norma L2 = 1)."""
+    vectors = []
+    for tokens in docs:
+        counts = Counter(tokens)
+        vec = {term: (count / len(tokens)) * idf.get(term, 0.0) for term, count in counts.items()} if tokens else {}
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        vectors.append({t: v / norm for t, v in vec.items()} if norm else {})
+    return vectors
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+def score_sections(sections: List[str], instructions: str | None = None) -> List[float]:
+    """
+    Puntua cada seccion por similitud coseno TF-IDF con el centroide del documento
+    y con las instrucciones del usuario.
+    """
+    docs = [_tokens(s) for s in sections]
+    n = len(docs)
+    df = Counter(term for tokens in docs for term in set(tokens))
+    idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+    vectors = _tfidf_vectors(docs, idf)
+
+    centroid: Dict[str, float] = {}
+    for vec in vectors:
+        for term, value in vec.items():
+            centroid[term] = centroid.get(term, 0.0) + value / n
+    norm = math.sqrt(sum(v * v for v in centroid.values()))
+    centroid = {t: v / norm for t, v in centroid.items()} if norm else {}
+
+    query = _tfidf_vectors([_tokens(instructions or "")], idf)[0]
+    return [
+        _cosine(vec, centroid) + (EXCERPT_INSTRUCTION_WEIGHT * _cosine(vec, query) if query else 0.0)
+        for vec in vectors
+    ]
+
+
+def select_excerpt(
+    text: str,
+    instructions: str | None,
+    budget: int,
+    measure: Callable[[str], int] = len
+) -> str:
+    """
+    Elige las secciones mas relevantes del documento que caben en el presupuesto.
+
+    Parametros:
+        text (str): Texto extraido del PDF
+        instructions (str | None): Instrucciones del usuario (tema, enfoque, etc.)
+        budget (int): Presupuesto del fragmento, en las unidades de measure
+        measure (Callable[[str], int]): Tamano de un texto (caracteres por defecto,
+            o tokens con utils.token_budget.count_tokens)
+
+    Retorna:
+        str: Secciones elegidas en el orden original, separadas por linea en blanco
+    """
+    text = (text or "").strip()
+    total = measure(text)
+    if total <= budget:
+        return text
+
+    sections = split_sections(text)
+    scores = score_sections(sections, instructions)
+    separator = measure("\n\n")
+
+    chosen = set()
+    used = 0
+    for index in sorted(range(len(sections)), key=lambda i: scores[i], reverse=True):
+        size = measure(sections[index]) + (separator if chosen else 0)
+        if used + size > budget:
+            continue
+        chosen.add(index)
+        used += size
+
+    excerpt = "\n\n".join(sections[i] for i in sorted(chosen))
+    metrics.observe("excerpt.coverage", len(chosen) / len(sections))
+    print(f"🎯 Fragmento relevante: {len(chosen)}/{len(sections)} secciones, {used} de {total} (presupuesto {budget})")
+    return excerpt
@@ -13,15 +13,29 @@
 import os  # Para acceder a variables de entorno y operaciones del sistema
 import sys  # Para acceso al sistema (no se usa mucho, pero puede ser util)
 import argparse  # Para parsear argumentos de linea de comandos (no se usa en produccion)
-from openai import AzureOpenAI  # Cliente para Azure OpenAI (Modelo de Lenguaje)
-from pypdf import PdfReader  # Biblioteca para leer PDFs (no se usa, se usa PyPDF2)
 from dotenv import load_dotenv  # Para cargar variables de entorno desde archivo .env
-from PyPDF2 import PdfReader  # Biblioteca para extraer texto de PDFs normales
-import fitz  # PyMuPDF - Para convertir paginas de PDF en imagenes (necesario para OCR)
-import pytesseract  # OCR (Reconocimiento Optico de Caracteres) - IA_Clase_01, IA_Clase_02
-from PIL import Image  # Pillow - Para procesar imagenes (necesario para OCR)
-import io  # Para trabajar con datos en memoria (BytesIO)
 import re  # Expresiones regulares para detectar patrones en texto
+import asyncio  # Para la variante async de la generacion del guion
+import time  # Para medir el tiempo de extraccion de cada pagina
+import threading  # Para detener el streaming del LLM desde el hilo del consumidor
+from types import SimpleNamespace  # Uso parcial (solo tokens de entrada) de los hedges cancelados
+from typing import TYPE_CHECKING, Callable, Iterator  # Para tipar los iteradores de paginas
+from services import ocr  # OCR en paralelo sobre un pool de procesos
+from services import pdf_backends  # Backends de la capa de texto (PyMuPDF / pypdf / PyPDF2)
+from services import excerpt  # Seleccion de las secciones mas relevantes (TF-IDF)
+from services import boilerplate  # Limpieza de encabezados/pies repetidos entre paginas
+from services.language import infer_target_script_language  # Idioma del guion (una pasada)
+from utils import pdf_text_cache  # Cache en disco del texto extraido (por SHA-256 del PDF)
+from utils import metrics, token_budget  # Metricas del proceso y conteo de tokens del prompt
+from utils import providers  # Registro de clientes compartidos (pool de conexiones)
+from utils import script_cache  # Cache de guiones generados (memoria + disco)
+from utils.deadline import Deadline, DeadlineExceeded, timeout_for  # Presupuesto de tiempo del job
+from utils import hedging  # Segunda peticion al LLM cuando la primera tarda demasiado
+
+# Cliente para Azure OpenAI (Modelo de Lenguaje): openai se importa al crear el
+# cliente (primer uso), no al arrancar el servidor
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI, AzureOpenAI
 
 # ============================================================================
 # CONFIGURACION DE VARIABLES DE ENTORNO
@@ -31,195 +45,6 @@ import re  # Expresiones regulares para detectar patrones en texto
 load_dotenv()
 
 
-def _infer_target_script_language(pdf_text: str, user_additional_input: str | None) -> str:
-    """
-    Decide si el guion debe ir en español, inglés o dejar que el modelo elija (auto).
-
-    Regla principal: el idioma de la PETICIÓN del usuario manda sobre el idioma del PDF.
-    Solo si el usuario no escribió nada útil se usa el PDF como pista.
-    """
-    user = (user_additional_input or "").strip().lower()
-    sample = (pdf_text or "")[:12000].lower()
-    blob_user = f" {user} "
-    blob_pdf = f" {sample} "
-
-    def explicit_spanish(s: str) -> bool:
-        return any(
-            p in s
-            for p in (
-                "español",
-                "espanol",
-                "en español",
-                "en espanol",
-                "castellano",
-                "habla en español",
-                "guion en español",
-                "video en español",
-                "guión en español",
-                "guion en espanol",
-            )
-        )
-
-    def explicit_english(s: str) -> bool:
-        return any(
-            p in s
-            for p in (
-                "english",
-                "in english",
-                "en inglés",
-                "en ingles",
-                "script in english",
-                "video in english",
-            )
-        )
-
-    # Palabras típicas cuando el usuario escribe la petición en español (aunque el PDF sea inglés)
-    SPANISH_USER_WORDS = (
-        "que",
-        "como",
-        "cómo",
-        "para",
-        "con",
-        "una",
-        "unos",
-        "unas",
-        "los",
-        "las",
-        "más",
-        "mas",
-        "también",
-        "tambien",
-        "este",
-        "esta",
-        "muy",
-        "sobre",
-        "hacer",
-        "haz",
-        "usa",
-        "quiero",
-        "tono",
-        "estilo",
-        "palabras",
-        "palabra",
-        "incluye",
-        "incluir",
-        "explica",
-        "breve",
-        "corto",
-        "divertido",
-        "formal",
-        "educativo",
-        "coloquial",
-        "guion",
-        "guión",
-        "video",
-        "nada",
-        "algo",
-        "así",
-        "asi",
-    )
-    ENGLISH_USER_WORDS = (
-        "the",
-        "and",
-        "with",
-        "that",
-        "this",
-        "from",
-        "your",
-        "make",
-        "please",
-        "want",
-        "tone",
-        "style",
-        "keywords",
-        "funny",
-        "serious",
-        "short",
-        "include",
-        "explain",
-        "script",
-    )
-
-    if user:
-        if explicit_spanish(user) and not explicit_english(user):
-            return "spanish"
-        if explicit_english(user) and not explicit_spanish(user):
-            return "english"
-        # Cualquier tilde / ñ en la petición → español (pide en español aunque el PDF sea otro idioma)
-        if any(c in user for c in "áéíóúñü¿¡"):
-            return "spanish"
-        sp_u = sum(blob_user.count(f" {w} ") for w in SPANISH_USER_WORDS)
-        en_u = sum(blob_user.count(f" {w} ") for w in ENGLISH_USER_WORDS)
-        if len(user) >= 4 and sp_u > en_u:
-            return "spanish"
-        if len(user) >= 4 and en_u > sp_u:
-            return "english"
-        # Imperativos / frases muy comunes en español
-        if re.search(
-            r"\b(hazlo|haz|usa|usar|cuéntame|cuentame|pon|ponme|dime|explicame|explícame)\b",
-            user,
-        ):
-            return "spanish"
-        if re.search(r"\b(make|use|tell me|give me|keep it)\b", user) and sp_u == 0:
-            return "english"
-
-    # Petición escrita pero empate (poco texto mezclado): no dejar que el PDF pise al usuario
-    if user:
-        return "auto"
-
-    # Sin texto del usuario: inferir idioma solo del PDF
-    if explicit_spanish(sample) and not explicit_english(sample[:800]):
-        return "spanish"
-
-    spanish_chars = sum(1 for c in (pdf_text or "")[:8000] if c in "áéíóúñüÁÉÍÓÚÑÜ¿¡")
-    sp_pdf = sum(
-        blob_pdf.count(f" {w} ")
-        for w in (
-            "el",
-            "la",
-            "de",
-            "que",
-            "los",
-            "las",
-            "una",
-            "con",
-            "por",
-            "para",
-            "como",
-            "más",
-            "mas",
-            "también",
-            "tambien",
-        )
-    )
-    if spanish_chars >= 8 or sp_pdf >= 22:
-        return "spanish"
-
-    en_pdf = sum(
-        blob_pdf.count(f" {w} ")
-        for w in (
-            "the",
-            "and",
-            "of",
-            "to",
-            "in",
-            "is",
-            "for",
-            "that",
-            "with",
-            "as",
-            "on",
-            "are",
-            "by",
-            "from",
-        )
-    )
-    if en_pdf >= 35 and spanish_chars < 4:
-        return "english"
-
-    return "auto"
-
-
 # ============================================================================
 # CONFIGURACION DE AZURE OPENAI (MODELO DE LENGUAJE - LLM)
 # ============================================================================
@@ -242,18 +67,313 @@ subscription_key = os.environ.get("AZURE_OPENAI_KEY")
 # Diferentes versiones pueden tener diferentes caracteristicas
 api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2024-12-01-preview")
 
+# Reintentos del cliente ante errores transitorios (429, 5xx, conexion)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
 # ============================================================================
 # INICIALIZACION DEL CLIENTE DE AZURE OPENAI
 # ============================================================================
 # Este cliente se usa para hacer peticiones al modelo de lenguaje GPT
 # Una vez inicializado, se puede usar para generar texto usando el metodo chat.completions.create()
-client = AzureOpenAI(
-    api_version=api_version,      # Version de la API
-    azure_endpoint=endpoint,      # URL del servicio
-    api_key=subscription_key,    # Clave de autenticacion
-)
+# Se crea en el primer uso (registro en utils/providers.py) con un pool de conexiones
+# compartido por todos los jobs; `genScript.client` sigue funcionando (ver __getattr__)
+def _build_client() -> "AzureOpenAI":
+    from openai import AzureOpenAI
+
+    if not subscription_key:
+        raise RuntimeError("AZURE_OPENAI_KEY is not set")
+    return AzureOpenAI(
+        api_version=api_version,      # Version de la API
+        azure_endpoint=endpoint,      # URL del servicio
+        api_key=subscription_key,    # Clave de autenticacion
+        http_client=providers.httpx_client(),  # Pool de conexiones con keep-alive
+        timeout=providers.httpx_timeout(),
+        max_retries=LLM_MAX_RETRIES,
+    )
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+
+providers.register("azure_openai", _build_client, close=lambda c: c.close())
+
+
+def get_client() -> "AzureOpenAI":
+    """Cliente de Azure OpenAI (se crea en el primer uso y se reusa)."""
+    return providers.get("azure_openai")
+
+
+# Cliente async para el servidor: cada job espera al LLM en el event loop (sin
+# ocupar un hilo) y las peticiones comparten conexiones HTTP/2 keep-alive
+def _build_async_client() -> "AsyncAzureOpenAI":
+    from openai import AsyncAzureOpenAI
+
+    if not subscription_key:
+        raise RuntimeError("AZURE_OPENAI_KEY is not set")
+    return AsyncAzureOpenAI(
+        api_version=api_version,
+        azure_endpoint=endpoint,
+        api_key=subscription_key,
+        http_client=providers.async_httpx_client(),
+        timeout=providers.httpx_timeout(),
+        max_retries=LLM_MAX_RETRIES,
+    )
+
+
+providers.register("azure_openai_async", _build_async_client, close=lambda c: c.close())
+
+
+def get_async_client() -> "AsyncAzureOpenAI":
+    """Cliente async de Azure OpenAI (se crea en el primer uso y se reusa)."""
+    return providers.get("azure_openai_async")
+
+
+def __getattr__(name: str):
+    # `from services.genScript import client` crea el cliente al pedirlo
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ============================================================================
+# PRESUPUESTO DEL PROMPT
+# ============================================================================
+# Tokens de entrada del LLM (mensaje de sistema + instrucciones + fragmento del PDF).
+# El fragmento mas relevante (ver services/excerpt.py) se recorta a los tokens que
+# quedan despues de las instrucciones (ver utils/token_budget.py).
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "4500"))
+# Caracteres que se extraen del PDF para elegir ese fragmento. La extraccion se
+# detiene al alcanzarlo (ver extract_text_from_pdf), asi el costo de un PDF grande
+# es proporcional a lo que realmente se usa.
+EXCERPT_SCAN_CHARS = int(os.getenv("EXCERPT_SCAN_CHARS", "60000"))
+# Version de la plantilla del prompt (instrucciones + mensaje de sistema). Forma
+# parte de la clave de la cache de guiones: subirla al cambiar el prompt invalida
+# los guiones generados con la plantilla anterior (ver utils/script_cache.py)
+PROMPT_TEMPLATE_VERSION = "1"
+
+# ============================================================================
+# DECISION DE OCR POR PAGINA
+# ============================================================================
+# Un PDF mezclado (texto + diapositivas escaneadas) no debe pagar OCR completo.
+# Cada pagina se evalua por separado: si su capa de texto esta vacia, contiene
+# glifos basura (ej: "/g123", "(cid:12)", caracteres de reemplazo) o es muy pobre
+# y la pagina tiene imagenes, solo ESA pagina se manda a OCR. Una pagina con poco
+# texto y sin imagenes (ej: una diapositiva de titulo) se conserva tal cual: el OCR
+# no encontraria nada mas.
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "25"))  # Minimo de caracteres alfanumericos
+OCR_MAX_GARBAGE_RATIO = float(os.getenv("OCR_MAX_GARBAGE_RATIO", "0.2"))  # Maxima fraccion de basura
+
+# Glifos sin mapeo a Unicode que dejan los extractores en PDFs codificados/escaneados
+_GARBAGE_GLYPH_RE = re.compile(r"/g\d+|\(cid:\d+\)|\ufffd|[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _page_needs_ocr(page_text: str, has_images: Callable[[], bool]) -> bool:
+    """
+    Decide si una pagina necesita OCR segun la calidad de su capa de texto.
+
+    Parametros:
+        page_text (str): Texto extraido de la capa de texto de la pagina
+        has_images (Callable): Indica si la pagina tiene imagenes (solo se consulta
+            si el texto es corto)
+
+    Retorna:
+        bool: True si la pagina no tiene texto util (vacia, mucha basura, o poco
+              texto con imagenes que pueden contener mas)
+    """
+    text = (page_text or "").strip()
+    alnum = sum(1 for c in text if c.isalnum())
+    if alnum == 0:
+        return True
+
+    garbage = sum(len(m) for m in _GARBAGE_GLYPH_RE.findall(text))
+    if garbage / max(len(text), 1) > OCR_MAX_GARBAGE_RATIO:
+        return True
+    return alnum < OCR_MIN_TEXT_CHARS and has_images()
+
+
+def _extractor_version() -> str:
+    """
+    Version del extractor: forma parte de la clave de la cache de texto, asi que
+    cualquier cambio en la extraccion (backend incluido) o en el OCR la invalida.
+    """
+    return (
+        f"6:{pdf_backends.get_backend().name}:min{OCR_MIN_TEXT_CHARS}-garbage{OCR_MAX_GARBAGE_RATIO}"
+        f":ocr-{ocr.OCR_LANG}-{ocr.OCR_LANG_MODE}{ocr.OCR_DETECT_PAGES}-conf{ocr.OCR_MIN_CONFIDENCE:g}-dpi{ocr.OCR_DPI}-gray{int(ocr.OCR_GRAYSCALE)}-bin{ocr.OCR_BINARIZE}"
+    )
+
+
+def _iter_pages_uncached(pdf_path: str, start_page: int = 0) -> Iterator[dict]:
+    """
+    Extrae el texto pagina por pagina, de forma PEREZOSA (solo lo que se consume).
+
+    Cada pagina usa su capa de texto (backend de services/pdf_backends.py) o, si es pobre/codificada, OCR
+    (decidido por pagina con _page_needs_ocr). Las paginas que necesitan OCR se
+    mandan por adelantado al pool (ventana acotada en services/ocr.py) para que
+    el OCR siga siendo paralelo aunque las paginas se entreguen una a una.
+
+    Parametros:
+        pdf_path (str): Ruta al PDF
+        start_page (int): Primera pagina a extraer (ej: para continuar una extraccion parcial)
+
+    Retorna:
+        Iterator[dict]: {"page": indice, "text": texto, "source": "text" | "ocr",
+                         "page_count": total de paginas} en orden; las paginas con
+                         OCR tambien traen "ocr_lang" y "ocr_seconds"
+    """
+    # ========================================================================
+    # INTENTO 1: EXTRACCION NORMAL DE TEXTO (NLP BASICO)
+    # ========================================================================
+    # Esto funciona si el PDF tiene texto seleccionable (no esta escaneado)
+    # El backend seleccionado (PyMuPDF, pypdf o PyPDF2) lee directamente el texto
+    # del PDF; si no existe, FileNotFoundError sube
+    with pdf_backends.get_backend().open(pdf_path) as doc:
+        page_count = doc.page_count
+        # Capa de texto de las paginas ya leidas (el OCR lee por adelantado)
+        text_layer: dict[int, str] = {}
+
+        # Decision de OCR de las paginas ya evaluadas
+        ocr_decisions: dict[int, bool] = {}
+
+        def read_text_layer(page_num: int) -> str:
+            if page_num not in text_layer:
+                # Si no hay texto o falla la pagina, el backend retorna cadena vacia
+                text_layer[page_num] = doc.page_text(page_num)
+            return text_layer[page_num]
+
+        # ====================================================================
+        # DETECCION INTELIGENTE: VERIFICAR QUE PAGINAS TIENEN TEXTO VALIDO
+        # ====================================================================
+        # Las paginas vacias, con glifos codificados (como "/g123", comun en PDFs
+        # escaneados) o con poco texto e imagenes se mandan a OCR; el resto conserva su texto
+        def needs_ocr(page_num: int) -> bool:
+            if page_num not in ocr_decisions:
+                ocr_decisions[page_num] = _page_needs_ocr(
+                    read_text_layer(page_num), lambda: doc.page_has_images(page_num)
+                )
+            return ocr_decisions[page_num]
+
+        def pages_needing_ocr() -> Iterator[int]:
+            for page_num in range(start_page, page_count):
+                if needs_ocr(page_num):
+                    yield page_num
+
+        ocr_results = None
+        try:
+            for page_num in range(start_page, page_count):
+                page_text = read_text_layer(page_num)
+                source = "text"
+                if needs_ocr(page_num):
+                    # ========================================================
+                    # INTENTO 2: USAR OCR (RECONOCIMIENTO OPTICO DE CARACTERES) - IA
+                    # ========================================================
+                    # Relacion: IA_Clase_01 (Fundamentos de IA), IA_Clase_02 (Topicos de IA)
+                    # Cada pagina se rasteriza y pasa por Tesseract en el pool de
+                    # procesos compartido; los textos llegan en el orden de las paginas
+                    if ocr_results is None:
+                        print("⚠️ PDF page(s) appear scanned or encoded — using OCR fallback for those pages...")
+                        ocr_results = ocr.ocr_pages(pdf_path, pages_needing_ocr())
+                    _, ocr_result = next(ocr_results)
+                    page_text = ocr_result["text"]
+                    source = "ocr"
+
+                text_layer.pop(page_num, None)
+                page = {"page": page_num, "text": page_text.strip(), "source": source, "page_count": page_count}
+                if source == "ocr":
+                    page.update(ocr_lang=ocr_result["lang"], ocr_seconds=round(ocr_result["seconds"], 3))
+                yield page
+        finally:
+            # Si el consumidor se detiene antes, cancelar el OCR pendiente
+            if ocr_results is not None:
+                ocr_results.close()
+
+
+def iter_pdf_pages(pdf_path: str, pdf_sha256: str | None = None) -> Iterator[dict]:
+    """
+    Iterador perezoso de las paginas del PDF, usando la cache en disco si es posible.
+
+    Las paginas que ya estan en cache se entregan sin trabajo. Si la cache tiene una
+    extraccion parcial (un consumidor anterior se detuvo antes), se continua desde
+    la siguiente pagina. Al terminar (o al detenerse el consumidor) se guarda en la
+    cache todo lo extraido.
+
+    Parametros:
+        pdf_path (str): Ruta al archivo PDF
+        pdf_sha256 (str | None): SHA-256 del PDF si ya se conoce (ej: calculado al subirlo)
+
+    Retorna:
+        Iterator[dict]: {"page": indice, "text": texto, "source": "text" | "ocr"} en orden
+    """
+    if pdf_sha256 is None:
+        pdf_sha256 = pdf_text_cache.sha256_file(pdf_path)
+
+    extractor_version = _extractor_version()
+    entry = pdf_text_cache.get(pdf_sha256, extractor_version)
+    cached = entry["pages"] if entry else []
+    if entry is not None:
+        print(f"♻️ Texto del PDF tomado de la cache ({len(cached)} pagina(s))")
+    for page in cached:
+        yield {**page, "cached": True}
+    if entry is not None and entry["complete"]:
+        return
+
+    pages = list(cached)
+    complete = False
+    try:
+        for page in _iter_pages_uncached(pdf_path, start_page=len(cached)):
+            pages.append(page)
+            yield page
+        complete = True
+    finally:
+        if complete or len(pages) > len(cached):
+            pdf_text_cache.put(pdf_sha256, extractor_version, pages, complete=complete)
+
+
+def extract_pdf_pages(pdf_path: str, pdf_sha256: str | None = None) -> list[dict]:
+    """
+    Extrae el texto de TODAS las paginas del PDF (ver iter_pdf_pages).
+
+    Retorna:
+        list[dict]: Una entrada por pagina: {"page": indice, "text": texto, "source": "text" | "ocr"}
+    """
+    return list(iter_pdf_pages(pdf_path, pdf_sha256))
+
+
+def iter_pdf_page_events(pdf_path: str, pdf_sha256: str | None = None, max_chars: int | None = None) -> Iterator[dict]:
+    """
+    Variante de extract_text_from_pdf que entrega un evento por pagina a medida que se
+    extrae, para reportar progreso y empezar trabajo posterior con las primeras paginas.
+
+    Parametros:
+        pdf_path (str): Ruta al archivo PDF
+        pdf_sha256 (str | None): SHA-256 del PDF si ya se conoce
+        max_chars (int | None): Presupuesto de caracteres (se detiene al alcanzarlo)
+
+    Retorna:
+        Iterator[dict]: {"page", "text", "source" ("text" | "ocr"), "cached" (bool),
+                         "page_count" (int | None), "elapsed" (segundos de la pagina),
+                         "chars" (caracteres acumulados)}
+    """
+    length = 0
+    pages = iter_pdf_pages(pdf_path, pdf_sha256)
+    try:
+        start = time.perf_counter()
+        for page in pages:
+            elapsed = time.perf_counter() - start
+            if page["text"]:
+                length += len(page["text"]) + 2
+            yield {
+                **page,
+                "cached": page.get("cached", False),
+                "page_count": page.get("page_count"),
+                "elapsed": elapsed,
+                "chars": length,
+            }
+            if max_chars is not None and length >= max_chars:
+                break
+            # No contar el tiempo que el consumidor tarda con el evento
+            start = time.perf_counter()
+    finally:
+        # Detener la extraccion (y el OCR pendiente) si el consumidor se detiene antes
+        pages.close()
+
+
+def extract_text_from_pdf(pdf_path: str, pdf_sha256: str | None = None, max_chars: int | None = None) -> str:
     """
     Extrae texto de un archivo PDF usando tecnicas de Procesamiento de Lenguaje Natural (NLP).
     
@@ -261,136 +381,62 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     - (Tokens e incrustaciones): El texto extraido se convierte en tokens para el LLM
     - (Fundamentos ): OCR es una aplicacion basica de IA
     
-    Si el PDF esta escaneado, usa OCR (Reconocimiento Optico de Caracteres) como fallback.
+    Las paginas escaneadas o con texto codificado usan OCR (Reconocimiento Optico de
+    Caracteres) como fallback, decidiendo PAGINA POR PAGINA (ver _page_needs_ocr).
     OCR es una tecnologia de IA que reconoce texto en imagenes.
+    El resultado se guarda en una cache en disco por SHA-256 del PDF, asi que
+    volver a subir el mismo PDF no repite la extraccion.
     
     Parametros:
         pdf_path (str): Ruta al archivo PDF del cual extraer texto
+        pdf_sha256 (str | None): SHA-256 del PDF si ya se conoce (evita volver a leerlo)
+        max_chars (int | None): Presupuesto de caracteres; la extraccion se detiene en
+            cuanto se alcanza (ej: EXCERPT_SCAN_CHARS, de donde sale el fragmento del LLM).
+            None extrae todo el documento.
     
     Retorna:
         str: Texto extraido del PDF, vacio si no se pudo extraer nada
     """
-    # Lista para almacenar el texto de cada pagina
-    text_parts = []
+    parts = [page["text"] for page in iter_pdf_page_events(pdf_path, pdf_sha256, max_chars)]
+    return join_pages(parts)
 
-    # ========================================================================
-    # INTENTO 1: EXTRACCION NORMAL DE TEXTO (NLP BASICO)
-    # ========================================================================
-    # Esto funciona si el PDF tiene texto seleccionable (no esta escaneado)
-    # PyPDF2 puede leer directamente el texto del PDF
-    try:
-        # Abrir el PDF en modo binario (rb = read binary)
-        with open(pdf_path, "rb") as f:
-            # Crear un lector de PDF usando PyPDF2
-            reader = PdfReader(f)
-            # Iterar sobre cada pagina del PDF
-            for page in reader.pages:
-                try:
-                    # Intentar extraer el texto de la pagina
-                    # Si no hay texto, retorna cadena vacia
-                    page_text = page.extract_text() or ""
-                except Exception:
-                    # Si hay un error al extraer texto de una pagina,
-                    # simplemente usar texto vacio para esa pagina
-                    page_text = ""
-                # Agregar el texto de la pagina a la lista
-                text_parts.append(page_text)
-    except FileNotFoundError:
-        # Si el archivo no existe, lanzar el error hacia arriba
-        raise
 
+def join_pages(pages: list[str]) -> str:
+    """
+    Une el texto de las paginas quitando lo que se repite en todas (encabezados,
+    pies, numeros de diapositiva, vinietas vacias; ver services/boilerplate.py).
+    Recibe TODAS las paginas en orden, incluidas las vacias: el indice de cada
+    pagina se usa para reconocer los numeros de pagina.
+    """
     # Unir todo el texto de todas las paginas con doble salto de linea
     # y eliminar espacios al inicio y final
-    text = "\n\n".join(text_parts).strip()
+    return "\n\n".join(page for page in boilerplate.strip_boilerplate(pages) if page).strip()
 
-    # ========================================================================
-    # DETECCION INTELIGENTE: VERIFICAR SI EL TEXTO ES VALIDO
-    # ========================================================================
-    # Si el texto esta vacio o contiene patrones que indican que esta codificado
-    # (como "/g123" que es un patron comun en PDFs escaneados),
-    # entonces usar OCR como fallback
-    if not text or re.search(r"/g\d+", text):
-        print("⚠️ PDF appears scanned or encoded — using OCR fallback...")
-        
-        # ====================================================================
-        # INTENTO 2: USAR OCR (RECONOCIMIENTO OPTICO DE CARACTERES) - IA
-        # ====================================================================
-        # OCR es una tecnologia de IA que reconoce texto en imagenes
-        # Relacion: IA_Clase_01 (Fundamentos de IA), IA_Clase_02 (Topicos de IA)
-        
-        # Reiniciar el texto para empezar desde cero
-        text = ""
-        
-        # Abrir el PDF usando PyMuPDF (fitz)
-        pdf = fitz.open(pdf_path)
-        
-        # Iterar sobre cada pagina del PDF
-        for page_num in range(len(pdf)):
-            # Cargar la pagina actual
-            page = pdf.load_page(page_num)
-            
-            # Convertir la pagina en un mapa de pixeles (imagen)
-            pix = page.get_pixmap()
-            
-            # Convertir la imagen a bytes en formato PNG
-            img_bytes = pix.tobytes("png")
-            
-            # Crear una imagen PIL desde los bytes en memoria
-            image = Image.open(io.BytesIO(img_bytes))
-            
-            # Tesseract OCR: Reconocimiento de texto en imagenes usando IA
-            # lang="eng+spa" significa que soporta ingles y espanol automaticamente
-            # El modelo de IA analiza la imagen y reconoce los caracteres
-            page_text = pytesseract.image_to_string(image, lang="eng+spa")
-            
-            # Agregar el texto reconocido al texto total
-            text += page_text + "\n\n"
-        
-        # Cerrar el PDF
-        pdf.close()
-
-    # Retornar el texto extraido, eliminando espacios al inicio y final
-    return text.strip()
-
-
-
-def generate_short_video_script(pdf_text: str, client: AzureOpenAI, deployment: str, user_additional_input: str | None = None) -> str:
+
+
+def build_script_messages(pdf_text: str, user_additional_input: str | None = None, target_lang: str | None = None) -> list[dict]:
     """
-    Genera un guion de video corto usando un MODELO DE LENGUAJE (LLM).
-    
-    RELACION CON IA:
-    - IA_Clase_05 (Introduccion a Modelos de Lenguaje): Usa un LLM (GPT) para generar texto
-    - IA_Clase_07 (Modelos de Lenguaje): Implementacion practica de un modelo de lenguaje
-    - IA_Clase_06 (Tokens e incrustaciones): El texto se convierte en tokens que el modelo procesa
-    
-    TECNOLOGIA: Azure OpenAI GPT (Modelo de Lenguaje Grande)
-    - El modelo recibe el texto del PDF como contexto
-    - Genera un guion creativo y entretenido basado en ese contexto
-    - Usa el patron de "chat completions" con mensajes de sistema y usuario
-    
+    Construye los mensajes (sistema + usuario) que se envian al LLM para generar el guion.
+
     Parametros:
         pdf_text (str): Texto extraido del PDF que servira como contexto
-        client (AzureOpenAI): Cliente configurado para hacer peticiones a Azure OpenAI
-        deployment (str): Nombre del modelo GPT a usar (ej: "gpt-5-mini")
         user_additional_input (str | None): Instrucciones adicionales del usuario (opcional)
-    
+        target_lang (str | None): Idioma ya inferido ("spanish" | "english" | "auto");
+            si es None se infiere aqui del texto y la peticion
+
     Retorna:
-        str: Guion de video generado por el modelo de IA
+        list[dict]: Mensajes en formato de chat completions
     """
-    print("🖊️ Generating short-form video script...")
-    
-    # ========================================================================
-    # PROCESAMIENTO DE TOKENS: LIMITAR EL TEXTO DE ENTRADA
-    # ========================================================================
-    # Los modelos de lenguaje tienen limites en la cantidad de tokens que pueden procesar
-    # Un token es aproximadamente 4 caracteres, pero puede variar
-    # Limitar el texto a 15000 caracteres para no exceder los limites del modelo
-    # Esto es parte del procesamiento de tokens (IA_Clase_06)
-    max_prompt_chars = 15000
-    # Truncar el texto del PDF a los primeros 15000 caracteres
-    truncated = pdf_text[:max_prompt_chars]
+    return _build_script_prompt(pdf_text, user_additional_input, target_lang)[0]
 
-    target_lang = _infer_target_script_language(truncated, user_additional_input)
+
+def _build_script_prompt(pdf_text: str, user_additional_input: str | None, target_lang: str | None) -> tuple[list[dict], str, str]:
+    """
+    Igual que build_script_messages, pero tambien retorna el idioma usado y el
+    fragmento del PDF incluido (forman parte de la clave de la cache de guiones).
+    """
+    if target_lang is None:
+        target_lang = infer_target_script_language(pdf_text, user_additional_input)
 
     # ========================================================================
     # CONSTRUCCION DE INSTRUCCIONES PARA EL MODELO
@@ -443,11 +489,49 @@ def generate_short_video_script(pdf_text: str, client: AzureOpenAI, deployment:
         "\n\nUse the following source material as inspiration (if relevant). "
         "Do not only summarize it; adapt it for short-form video. "
         "If it is not relevant, create an original script on the theme implied by the user.\n\n"
-        f"Source excerpt:\n{truncated}"
+        "Source excerpt:\n"
     )
 
     print(f"🌐 Target script language hint for LLM: {target_lang}")
 
+    system_prompt = (
+        "You are a short-form video scriptwriter. "
+        "You only output spoken script text (no notes, no structure). "
+        "Respect the LANGUAGE rules in the user message; never default to English when Spanish is required. "
+        "When user preferences are provided, follow them (tone, style, keywords, slang/colloquialisms)."
+    )
+
+    # ========================================================================
+    # PROCESAMIENTO DE TOKENS: LIMITAR EL TEXTO DE ENTRADA
+    # ========================================================================
+    # Los modelos de lenguaje tienen limites en la cantidad de tokens que pueden procesar
+    # Un token es aproximadamente 4 caracteres, pero varia con el idioma y el ruido de OCR,
+    # asi que el fragmento del PDF se mide en tokens: recibe lo que queda de
+    # PROMPT_MAX_TOKENS despues del mensaje de sistema y las instrucciones (IA_Clase_06)
+    # En lugar de los primeros caracteres (portada, indice) se eligen las secciones
+    # mas relevantes por TF-IDF (ver services/excerpt.py)
+    instruction_tokens = token_budget.count_message_tokens([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_instructions},
+    ])
+    excerpt_budget = max(0, PROMPT_MAX_TOKENS - instruction_tokens)
+    truncated = excerpt.select_excerpt(
+        pdf_text, user_additional_input, excerpt_budget, measure=token_budget.count_tokens
+    )
+    truncated = token_budget.truncate_to_tokens(truncated, excerpt_budget)
+    user_instructions += truncated
+
+    excerpt_tokens = token_budget.count_tokens(truncated)
+    prompt_tokens = instruction_tokens + excerpt_tokens
+    print(
+        f"🧮 Tokens del prompt ({token_budget.backend_name()}): sistema "
+        f"{token_budget.count_tokens(system_prompt)}, instrucciones+formato "
+        f"{instruction_tokens - token_budget.count_tokens(system_prompt)}, fragmento {excerpt_tokens}, "
+        f"total {prompt_tokens}/{PROMPT_MAX_TOKENS}"
+    )
+    metrics.observe("llm.prompt_tokens", prompt_tokens)
+    metrics.observe("llm.excerpt_tokens", excerpt_tokens)
+
     # ========================================================================
     # CONSTRUCCION DEL PROMPT PARA EL MODELO DE LENGUAJE
     # ========================================================================
@@ -455,17 +539,125 @@ def generate_short_video_script(pdf_text: str, client: AzureOpenAI, deployment:
     # 1. Mensaje de sistema: Define el "rol" del modelo (como un guionista)
     # 2. Mensaje de usuario: Contiene las instrucciones y el contexto
     messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a short-form video scriptwriter. "
-                "You only output spoken script text (no notes, no structure). "
-                "Respect the LANGUAGE rules in the user message; never default to English when Spanish is required. "
-                "When user preferences are provided, follow them (tone, style, keywords, slang/colloquialisms)."
-            ),
-        },
+        {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_instructions},
     ]
+    return messages, target_lang, truncated
+
+
+# ============================================================================
+# CONTABILIDAD DE LLAMADAS AL LLM (TOKENS Y LATENCIA)
+# ============================================================================
+# Cada llamada registra los tokens que reporta el modelo (usage), el deployment,
+# la latencia total y, en streaming, el tiempo hasta el primer token. Los
+# registros se agregan a la lista usage_log del job (si se pasa) y a las metricas.
+def record_llm_call(
+    usage_log: list | None,
+    kind: str,
+    deployment: str,
+    usage,
+    started: float,
+    first_token_at: float | None = None,
+    ended: float | None = None,
+) -> dict:
+    """
+    Registra una llamada al LLM.
+
+    Parametros:
+        usage_log (list | None): Lista del job donde se agrega el registro (opcional)
+        kind (str): "script" | "summary"
+        deployment (str): Modelo usado
+        usage: Objeto usage de la respuesta (None si el modelo no lo envio)
+        started (float): time.perf_counter() al enviar la peticion
+        first_token_at (float | None): time.perf_counter() del primer token (streaming)
+        ended (float | None): time.perf_counter() al terminar (por defecto, ahora)
+
+    Retorna:
+        dict: {"kind", "deployment", "prompt_tokens", "completion_tokens",
+               "latency_seconds", "ttft_seconds"}
+    """
+    now = ended if ended is not None else time.perf_counter()
+    record = {
+        "kind": kind,
+        "deployment": deployment,
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "latency_seconds": round(now - started, 3),
+        # Sin streaming la respuesta llega completa: no hay primer token por separado
+        "ttft_seconds": round(first_token_at - started, 3) if first_token_at is not None else None,
+    }
+    metrics.incr(f"llm.calls.{kind}")
+    metrics.observe(f"llm.call_seconds.{kind}", record["latency_seconds"])
+    if record["ttft_seconds"] is not None:
+        metrics.observe("llm.ttft_seconds", record["ttft_seconds"])
+    if record["prompt_tokens"] is not None:
+        metrics.incr("llm.usage.prompt_tokens", record["prompt_tokens"])
+        metrics.incr(f"llm.usage.prompt_tokens.{deployment}", record["prompt_tokens"])
+        metrics.observe(f"llm.usage.prompt_tokens_per_call.{kind}", record["prompt_tokens"])
+    if record["completion_tokens"] is not None:
+        metrics.incr("llm.usage.completion_tokens", record["completion_tokens"])
+        metrics.incr(f"llm.usage.completion_tokens.{deployment}", record["completion_tokens"])
+        metrics.observe(f"llm.usage.completion_tokens_per_call.{kind}", record["completion_tokens"])
+    if usage_log is not None:
+        usage_log.append(record)
+    return record
+
+
+def summarize_llm_usage(usage_log: list) -> dict:
+    """Totales de las llamadas de un job (para guardarlos en el job)."""
+    return {
+        "calls": list(usage_log),
+        "prompt_tokens": sum(c["prompt_tokens"] or 0 for c in usage_log),
+        "completion_tokens": sum(c["completion_tokens"] or 0 for c in usage_log),
+        "latency_seconds": round(sum(c["latency_seconds"] for c in usage_log), 3),
+    }
+
+
+def generate_short_video_script(pdf_text: str, client: "AzureOpenAI", deployment: str, user_additional_input: str | None = None, timeout: float | None = None, target_lang: str | None = None, use_cache: bool = True, long_document: bool | None = None, usage_log: list | None = None, deadline: Deadline | None = None) -> str:
+    """
+    Genera un guion de video corto usando un MODELO DE LENGUAJE (LLM).
+    
+    RELACION CON IA:
+    - IA_Clase_05 (Introduccion a Modelos de Lenguaje): Usa un LLM (GPT) para generar texto
+    - IA_Clase_07 (Modelos de Lenguaje): Implementacion practica de un modelo de lenguaje
+    - IA_Clase_06 (Tokens e incrustaciones): El texto se convierte en tokens que el modelo procesa
+    
+    TECNOLOGIA: Azure OpenAI GPT (Modelo de Lenguaje Grande)
+    - El modelo recibe el texto del PDF como contexto
+    - Genera un guion creativo y entretenido basado en ese contexto
+    - Usa el patron de "chat completions" con mensajes de sistema y usuario
+    
+    Parametros:
+        pdf_text (str): Texto extraido del PDF que servira como contexto
+        client (AzureOpenAI): Cliente configurado para hacer peticiones a Azure OpenAI
+        deployment (str): Nombre del modelo GPT a usar (ej: "gpt-5-mini")
+        user_additional_input (str | None): Instrucciones adicionales del usuario (opcional)
+        timeout (float | None): Timeout de la llamada al LLM en segundos (deadline del job)
+        target_lang (str | None): Idioma ya inferido ("spanish" | "english" | "auto");
+            si es None se infiere aqui del texto y la peticion
+        use_cache (bool): False para ignorar la cache de guiones y llamar siempre al LLM
+            (el resultado nuevo si se guarda)
+        long_document (bool | None): True/False fuerza o desactiva el modo map-reduce
+            para documentos largos; None decide segun LONG_DOC_MODE
+        usage_log (list | None): Lista donde se agregan los tokens y la latencia de
+            cada llamada al LLM (ver record_llm_call)
+        deadline (Deadline | None): Deadline del job; cada llamada al LLM (resumenes
+            incluidos) recibe el tiempo que queda en ese momento, con `timeout` como tope
+    
+    Retorna:
+        str: Guion de video generado por el modelo de IA
+
+    Lanza:
+        DeadlineExceeded: Si el deadline vence antes de pedir el guion
+    """
+    print("🖊️ Generating short-form video script...")
+    chunks, target_lang = _long_document_plan(pdf_text, user_additional_input, target_lang, long_document)
+    if chunks:
+        pdf_text = summarize_long_document(pdf_text, chunks, client, deployment, timeout, usage_log, deadline)
+    # Misma peticion ya respondida (mismo modelo, plantilla, idioma, fragmento e instrucciones)
+    request, cache_key, cached = _prepare_script_request(pdf_text, deployment, user_additional_input, target_lang, use_cache)
+    if cached:
+        return cached
 
     print("🖊️ Sending request to Azure OpenAI...")
 
@@ -475,12 +667,68 @@ def generate_short_video_script(pdf_text: str, client: AzureOpenAI, deployment:
     # Esta es la llamada que realmente usa la IA para generar el guion
     # El modelo procesa los tokens (IA_Clase_06) y genera texto nuevo
     # basado en el contexto y las instrucciones (IA_Clase_05, IA_Clase_07)
-    response = client.chat.completions.create(
-        messages=messages,                    # Los mensajes con instrucciones y contexto
-        max_completion_tokens=1500,          # Limite de tokens de salida (aproximadamente 6000 caracteres)
-        model=deployment,                     # Nombre del modelo GPT (ej: gpt-5-mini)
-    )
+    options = _request_options(timeout, deadline)
+    started = time.perf_counter()
+    response = client.chat.completions.create(**request, **options)
+
+    # Retornar el guion completo generado por la IA
+    return _finish_script(response, deployment, cache_key, started, usage_log)
 
+
+def _request_options(timeout: float | None, deadline: Deadline | None = None, stage: str = "script_generation") -> dict:
+    """
+    Timeout de una llamada al LLM: lo que queda del deadline en este momento (con
+    `timeout` como tope). Solo se pasa si hay alguno (timeout=None desactivaria el
+    timeout del cliente).
+
+    Lanza:
+        DeadlineExceeded: Si el deadline ya vencio
+    """
+    timeout = timeout_for(deadline, timeout, stage)
+    return {"timeout": timeout} if timeout is not None else {}
+
+
+def _prepare_script_request(
+    pdf_text: str,
+    deployment: str,
+    user_additional_input: str | None,
+    target_lang: str | None,
+    use_cache: bool,
+) -> tuple[dict, str, str | None]:
+    """
+    Preparacion comun de las tres variantes de generacion (normal, async y streaming):
+    prompt, clave de la cache de guiones y guion en cache.
+
+    Retorna:
+        tuple[dict, str, str | None]: (argumentos de chat.completions.create, clave de
+                                       la cache, guion en cache o None)
+    """
+    messages, target_lang, source_excerpt = _build_script_prompt(pdf_text, user_additional_input, target_lang)
+    cache_key = script_cache.make_key(deployment, PROMPT_TEMPLATE_VERSION, target_lang, source_excerpt, user_additional_input)
+    cached = script_cache.get(cache_key) if use_cache else None
+    if cached:
+        print("♻️  Guion recuperado de la cache (sin llamada al LLM)")
+    request = {
+        "messages": messages,                 # Los mensajes con instrucciones y contexto
+        "max_completion_tokens": 1500,        # Limite de tokens de salida (aproximadamente 6000 caracteres)
+        "model": deployment,                  # Nombre del modelo GPT (ej: gpt-5-mini)
+    }
+    return request, cache_key, cached
+
+
+def _finish_script(response, deployment: str, cache_key: str, started: float, usage_log: list | None) -> str:
+    """Registra el uso de la llamada, extrae el guion y lo guarda en la cache."""
+    record_llm_call(usage_log, "script", deployment, getattr(response, "usage", None), started)
+    script = _response_text(response)
+    # Mostrar las primeras 10 palabras del guion generado para debugging
+    print("First 10 words of generated script:", " ".join(script.split()[:10]))
+    if script:
+        script_cache.put(cache_key, script)
+    return script
+
+
+def _response_text(response) -> str:
+    """Texto del guion dentro de la respuesta de chat completions."""
     # ========================================================================
     # EXTRAER EL TEXTO GENERADO POR EL MODELO
     # ========================================================================
@@ -492,12 +740,365 @@ def generate_short_video_script(pdf_text: str, client: AzureOpenAI, deployment:
     except Exception:
         # Si falla, intentar obtenerlo desde otro atributo (compatibilidad)
         script = getattr(response.choices[0], "text", "").strip()
+    return script
 
-    # Mostrar las primeras 10 palabras del guion generado para debugging
-    print("First 10 words of generated script:", " ".join(script.split()[:10])) 
 
-    # Retornar el guion completo generado por la IA
-    return script
+async def agenerate_short_video_script(
+    pdf_text: str,
+    client: "AsyncAzureOpenAI",
+    deployment: str,
+    user_additional_input: str | None = None,
+    timeout: float | None = None,
+    target_lang: str | None = None,
+    use_cache: bool = True,
+    long_document: bool | None = None,
+    usage_log: list | None = None,
+    deadline: Deadline | None = None,
+) -> str:
+    """
+    Variante async de generate_short_video_script (mismos parametros, con el cliente
+    AsyncAzureOpenAI). Armar el prompt y leer la cache corre en un hilo; la espera al
+    LLM, que es casi todo el tiempo, no ocupa ninguno.
+    """
+    print("🖊️ Generating short-form video script...")
+    chunks, target_lang = await asyncio.to_thread(
+        _long_document_plan, pdf_text, user_additional_input, target_lang, long_document
+    )
+    if chunks:
+        pdf_text = await asummarize_long_document(pdf_text, chunks, client, deployment, timeout, usage_log, deadline)
+    request, cache_key, cached = await asyncio.to_thread(
+        _prepare_script_request, pdf_text, deployment, user_additional_input, target_lang, use_cache
+    )
+    if cached:
+        return cached
+
+    print("🖊️ Sending request to Azure OpenAI...")
+    # Con LLM_HEDGING=1 una llamada lenta se duplica y gana la primera (ver utils/hedging.py)
+    # Peticiones duplicadas que se cancelaron (inicio, fin): tambien se pagan
+    cancelled: list[tuple[float, float]] = []
+    started = time.perf_counter()
+    # El timeout se calcula al lanzar cada peticion: el hedge sale despues de la
+    # espera y solo debe recibir el tiempo que queda del deadline
+    response = await hedging.run(
+        lambda: client.chat.completions.create(**request, **_request_options(timeout, deadline)),
+        on_cancelled=lambda *attempt: cancelled.append(attempt),
+    )
+    # Misma peticion: se cobran los mismos tokens de entrada; los de salida que
+    # alcanzo a generar no se conocen (no hubo respuesta)
+    prompt_only = SimpleNamespace(
+        prompt_tokens=getattr(getattr(response, "usage", None), "prompt_tokens", None)
+    )
+    for attempt_started, attempt_ended in cancelled:
+        record_llm_call(
+            usage_log, "script_hedge", deployment, prompt_only,
+            attempt_started, ended=attempt_ended,
+        )
+    return await asyncio.to_thread(_finish_script, response, deployment, cache_key, started, usage_log)
+
+
+# ============================================================================
+# GENERACION EN STREAMING (PARA TTS INCREMENTAL)
+# ============================================================================
+# Con stream=True el modelo entrega el guion token por token. Se corta en fin de
+# oracion para que cada fragmento se pueda sintetizar mientras el LLM sigue
+# escribiendo (ver genTTS.generate_tts_streaming).
+# Minimo de caracteres por fragmento (oraciones muy cortas se juntan con la siguiente)
+STREAM_MIN_CHUNK_CHARS = int(os.getenv("STREAM_MIN_CHUNK_CHARS", "60"))
+_SENTENCE_BOUNDARY_RE = re.compile(r"[.!?…](?:[\"')\]]*)\s+")
+
+
+def stream_short_video_script(
+    pdf_text: str,
+    client: "AzureOpenAI",
+    deployment: str,
+    user_additional_input: str | None = None,
+    timeout: float | None = None,
+    target_lang: str | None = None,
+    use_cache: bool = True,
+    long_document: bool | None = None,
+    usage_log: list | None = None,
+    stop: threading.Event | None = None,
+    deadline: Deadline | None = None,
+) -> Iterator[str]:
+    """
+    Variante en streaming de generate_short_video_script. Si el guion esta en la
+    cache se entrega cortado en oraciones sin llamar al LLM. Si `stop` se activa
+    (el consumidor ya no quiere el guion), el stream del LLM se cierra en el
+    siguiente evento y el guion incompleto no se guarda en la cache.
+
+    Retorna:
+        Iterator[str]: Fragmentos del guion cortados en fin de oracion (con su espacio
+                       final), en orden; unidos con "".join forman el guion completo
+    """
+    print("🖊️ Generating short-form video script (streaming)...")
+    chunks, target_lang = _long_document_plan(pdf_text, user_additional_input, target_lang, long_document)
+    if chunks:
+        pdf_text = summarize_long_document(pdf_text, chunks, client, deployment, timeout, usage_log, deadline)
+    request, cache_key, cached = _prepare_script_request(pdf_text, deployment, user_additional_input, target_lang, use_cache)
+    if cached:
+        yield from _split_sentences(cached)
+        return
+
+    options = _request_options(timeout, deadline)
+    started = time.perf_counter()
+    stream = client.chat.completions.create(
+        **request,
+        stream=True,
+        # El ultimo evento trae el usage (tokens) de la llamada
+        stream_options={"include_usage": True},
+        **options,
+    )
+
+    buffer = ""
+    parts = []
+    usage = None
+    first_token_at = None
+    try:
+        for event in stream:
+            if stop is not None and stop.is_set():
+                return
+            usage = getattr(event, "usage", None) or usage
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content or ""
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            buffer += delta
+            parts.append(delta)
+            # Entregar hasta el ultimo fin de oracion si el fragmento ya es suficientemente largo
+            cut = 0
+            for match in _SENTENCE_BOUNDARY_RE.finditer(buffer):
+                if match.end() >= STREAM_MIN_CHUNK_CHARS:
+                    cut = match.end()
+            if cut:
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+    record_llm_call(usage_log, "script", deployment, usage, started, first_token_at)
+    if buffer.strip():
+        yield buffer
+
+    script = "".join(parts).strip()
+    if script:
+        script_cache.put(cache_key, script)
+
+
+def _split_sentences(text: str) -> Iterator[str]:
+    """Corta un guion completo en fragmentos de fin de oracion (mismo criterio que el streaming)."""
+    start = 0
+    for match in _SENTENCE_BOUNDARY_RE.finditer(text):
+        if match.end() - start >= STREAM_MIN_CHUNK_CHARS:
+            yield text[start:match.end()]
+            start = match.end()
+    if text[start:].strip():
+        yield text[start:]
+
+# ============================================================================
+# DOCUMENTOS LARGOS (MAP-REDUCE)
+# ============================================================================
+# Si el texto es mucho mas grande que el presupuesto del prompt, el fragmento por
+# TF-IDF deja fuera casi todo el documento. En ese caso:
+# - map: el texto se divide en bloques y cada bloque se resume con el LLM, hasta
+#   LONG_DOC_CONCURRENCY a la vez
+# - reduce: el guion se escribe a partir de los resumenes unidos, en orden
+# Los resumenes se guardan en la cache por hash del bloque (sin el idioma del
+# guion), asi una re-subida o el mismo PDF en otro idioma no los vuelve a pedir.
+# Con el deadline del job, los resumenes solo pueden usar el tiempo que queda menos
+# LONG_DOC_SCRIPT_RESERVE_SECONDS (reservados para el guion); si no alcanza se deja
+# de resumir y el guion se escribe con el fragmento del texto original.
+# LONG_DOC_MODE: off (por defecto) | auto (si el texto supera LONG_DOC_MIN_TOKENS) | on
+# Es opcional: con el modo activo se extrae mucho mas texto del PDF (ver scan_chars)
+# y cada documento largo paga hasta LONG_DOC_MAX_CHUNKS llamadas extra al LLM.
+LONG_DOC_MODE = os.getenv("LONG_DOC_MODE", "off").strip().lower()
+LONG_DOC_MIN_TOKENS = int(os.getenv("LONG_DOC_MIN_TOKENS", str(3 * PROMPT_MAX_TOKENS)))
+LONG_DOC_CHUNK_CHARS = int(os.getenv("LONG_DOC_CHUNK_CHARS", "12000"))
+# Maximo de bloques resumidos por documento (acota el costo; se eligen repartidos)
+LONG_DOC_MAX_CHUNKS = int(os.getenv("LONG_DOC_MAX_CHUNKS", "16"))
+LONG_DOC_CONCURRENCY = int(os.getenv("LONG_DOC_CONCURRENCY", "4"))
+LONG_DOC_SUMMARY_TOKENS = int(os.getenv("LONG_DOC_SUMMARY_TOKENS", "600"))
+LONG_DOC_SCRIPT_RESERVE_SECONDS = float(os.getenv("LONG_DOC_SCRIPT_RESERVE_SECONDS", "90"))
+# Version del prompt de resumen (parte de la clave de la cache de resumenes)
+SUMMARY_TEMPLATE_VERSION = "1"
+
+
+def scan_chars() -> int:
+    """Caracteres a extraer del PDF: con el modo documento largo activo se lee mas alla de EXCERPT_SCAN_CHARS."""
+    if LONG_DOC_MODE == "off":
+        return EXCERPT_SCAN_CHARS
+    return max(EXCERPT_SCAN_CHARS, LONG_DOC_CHUNK_CHARS * LONG_DOC_MAX_CHUNKS)
+
+
+def _use_long_document(pdf_text: str, long_document: bool | None) -> bool:
+    """Decide si se usa map-reduce (long_document=None sigue LONG_DOC_MODE)."""
+    if long_document is not None:
+        return long_document
+    if LONG_DOC_MODE == "on":
+        return True
+    if LONG_DOC_MODE != "auto":
+        return False
+    # Barato primero: un texto corto nunca llega al umbral (>= 1 caracter por token)
+    return len(pdf_text) > LONG_DOC_MIN_TOKENS and token_budget.count_tokens(pdf_text) > LONG_DOC_MIN_TOKENS
+
+
+def _long_document_plan(
+    pdf_text: str,
+    user_additional_input: str | None,
+    target_lang: str | None,
+    long_document: bool | None,
+) -> tuple[list[str], str | None]:
+    """
+    Paso previo comun de las variantes de generacion: bloques a resumir (lista vacia
+    si no se usa map-reduce) e idioma del guion. Con map-reduce el idioma se infiere
+    aqui, del texto completo, antes de que los resumenes lo reemplacen.
+    """
+    if not _use_long_document(pdf_text, long_document):
+        return [], target_lang
+    if target_lang is None:
+        target_lang = infer_target_script_language(pdf_text, user_additional_input)
+    chunks = excerpt.split_sections(pdf_text, LONG_DOC_CHUNK_CHARS)
+    if len(chunks) > LONG_DOC_MAX_CHUNKS:
+        # Si son demasiados se eligen repartidos por todo el documento
+        step = len(chunks) / LONG_DOC_MAX_CHUNKS
+        chunks = [chunks[int(i * step)] for i in range(LONG_DOC_MAX_CHUNKS)]
+    print(f"📚 Documento largo: resumiendo {len(chunks)} bloque(s) ({LONG_DOC_CONCURRENCY} a la vez)...")
+    metrics.incr("long_document.documents")
+    metrics.observe("long_document.chunks", len(chunks))
+    return chunks, target_lang
+
+
+def _summary_request(deployment: str, chunk: str) -> tuple[str, str | None, dict]:
+    """Clave de la cache, resumen en cache (o None) y argumentos de la llamada para un bloque."""
+    key = script_cache.make_summary_key(deployment, SUMMARY_TEMPLATE_VERSION, chunk)
+    request = {
+        "messages": [
+            {
+                "role": "system",
+                "content": "You summarize course material into concise study notes. Output only the notes.",
+            },
+            {
+                "role": "user",
+                "content": (
+                    "Summarize the key ideas of this part of a document in at most 150 words. "
+                    "Keep definitions, names, dates and numbers. "
+                    "Write in the SAME language as the text.\n\n"
+                    f"Text:\n{chunk}"
+                ),
+            },
+        ],
+        "max_completion_tokens": LONG_DOC_SUMMARY_TOKENS,
+        "model": deployment,
+    }
+    return key, script_cache.get(key), request
+
+
+def _finish_summary(response, deployment: str, key: str, started: float, usage_log: list | None) -> str:
+    """Registra el uso de la llamada y guarda el resumen en la cache."""
+    record_llm_call(usage_log, "summary", deployment, getattr(response, "usage", None), started)
+    summary = _response_text(response)
+    if summary:
+        script_cache.put(key, summary)
+    return summary
+
+
+def _map_deadline(deadline: Deadline | None) -> Deadline | None:
+    """Deadline de los resumenes: el del job menos el tiempo reservado para el guion."""
+    if deadline is None:
+        return None
+    return Deadline(deadline.expires_at - LONG_DOC_SCRIPT_RESERVE_SECONDS)
+
+
+def _summarize_chunk(client: "AzureOpenAI", deployment: str, chunk: str, timeout: float | None, deadline: Deadline | None, usage_log: list | None = None) -> str:
+    """
+    Resumen de un bloque (map), desde la cache si ya se pidio antes.
+
+    Lanza:
+        DeadlineExceeded: Si ya no queda tiempo para resumir (y no esta en cache)
+    """
+    key, cached, request = _summary_request(deployment, chunk)
+    if cached:
+        return cached
+    options = _request_options(timeout, deadline, stage="long_document_summary")
+    started = time.perf_counter()
+    response = client.chat.completions.create(**request, **options)
+    return _finish_summary(response, deployment, key, started, usage_log)
+
+
+async def _asummarize_chunk(client: "AsyncAzureOpenAI", deployment: str, chunk: str, timeout: float | None, deadline: Deadline | None, usage_log: list | None = None) -> str:
+    """Variante async de _summarize_chunk."""
+    key, cached, request = await asyncio.to_thread(_summary_request, deployment, chunk)
+    if cached:
+        return cached
+    options = _request_options(timeout, deadline, stage="long_document_summary")
+    started = time.perf_counter()
+    response = await client.chat.completions.create(**request, **options)
+    return await asyncio.to_thread(_finish_summary, response, deployment, key, started, usage_log)
+
+
+def _merge_summaries(pdf_text: str, chunks: list[str], results: list, started: float) -> str:
+    """
+    Reduce: une los resumenes en orden. Un bloque que fallo se omite; si fallaron
+    todos, o el deadline corto los resumenes, se usa el texto original (el prompt
+    lo recorta como siempre).
+    """
+    metrics.observe("long_document.map_seconds", time.perf_counter() - started)
+    skipped = sum(1 for result in results if isinstance(result, DeadlineExceeded))
+    if skipped:
+        print(f"⏱️  Sin tiempo para resumir {skipped}/{len(chunks)} bloque(s): se usa el fragmento del texto original")
+        metrics.incr("long_document.deadline_fallbacks")
+        return pdf_text
+    summaries = []
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"⚠️  No se pudo resumir el bloque {i + 1}/{len(chunks)}: {result}")
+            metrics.incr("long_document.chunk_errors")
+        elif result:
+            summaries.append(result)
+    if not summaries:
+        return pdf_text
+    print(f"📚 Documento largo: {len(summaries)}/{len(chunks)} bloque(s) resumido(s)")
+    return "\n\n".join(summaries)
+
+
+def summarize_long_document(pdf_text: str, chunks: list[str], client: "AzureOpenAI", deployment: str, timeout: float | None = None, usage_log: list | None = None, deadline: Deadline | None = None) -> str:
+    """
+    Resume los bloques de un documento largo en paralelo (map, ver _long_document_plan)
+    y une los resumenes (reduce); el resultado reemplaza al texto del PDF en el prompt del guion.
+    Cada resumen revisa el deadline antes de pedirse (ver _map_deadline).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.perf_counter()
+    map_deadline = _map_deadline(deadline)
+
+    def summarize(chunk: str):
+        try:
+            return _summarize_chunk(client, deployment, chunk, timeout, map_deadline, usage_log)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, LONG_DOC_CONCURRENCY)) as pool:
+        results = list(pool.map(summarize, chunks))
+    return _merge_summaries(pdf_text, chunks, results, started)
+
+
+async def asummarize_long_document(pdf_text: str, chunks: list[str], client: "AsyncAzureOpenAI", deployment: str, timeout: float | None = None, usage_log: list | None = None, deadline: Deadline | None = None) -> str:
+    """Variante async de summarize_long_document (la concurrencia se acota con un semaforo)."""
+    started = time.perf_counter()
+    map_deadline = _map_deadline(deadline)
+    semaphore = asyncio.Semaphore(max(1, LONG_DOC_CONCURRENCY))
+
+    async def summarize(chunk: str) -> str:
+        async with semaphore:
+            return await _asummarize_chunk(client, deployment, chunk, timeout, map_deadline, usage_log)
+
+    results = await asyncio.gather(*(summarize(chunk) for chunk in chunks), return_exceptions=True)
+    return _merge_summaries(pdf_text, chunks, results, started)
 
 #main
 
@@ -506,5 +1107,5 @@ if __name__ == "__main__":
     pdf_path = "photos/Clase_08.pdf"
     user_additional_input = "Haz el video en español, no en inglés. Y usa palabras coloquiales como no mames, o wey, etc."
     pdf_text = extract_text_from_pdf(pdf_path)
-    script = generate_short_video_script(pdf_text, client, deployment, user_additional_input)
+    script = generate_short_video_script(pdf_text, get_client(), deployment, user_additional_input)
     print(script)
\ No newline at end of file
@@ -17,6 +17,9 @@ import os  # Para acceder a variables de entorno y crear directorios
 import random  # Para seleccionar voces aleatoriamente
 import asyncio  # Para ejecutar funciones asincronas (async/await)
 import re  # Etiquetas de idioma al inicio del guion ([SP], [ES], [EN])
+import wave  # Para escribir el audio PCM del TTS incremental como WAV
+from typing import TYPE_CHECKING, AsyncIterator  # Tipos de dependencias que se importan de forma perezosa
+from services import language  # Deteccion de idioma compartida con genScript
 
 # ============================================================================
 # CARGA DE VARIABLES DE ENTORNO
@@ -37,7 +40,9 @@ except Exception:
 # SDK de Azure Cognitive Services para Text-to-Speech
 # Esta es la tecnologia de IA que convierte texto en audio de voz
 # Relacion: (Topicos de IA), (Modelos de Lenguaje)
-import azure.cognitiveservices.speech as speechsdk  # type: ignore
+# Se importa al sintetizar por primera vez (no en el arranque del servidor)
+if TYPE_CHECKING:
+    import azure.cognitiveservices.speech as speechsdk  # type: ignore
 
 # ============================================================================
 # CONFIGURACION DE VOCES DISPONIBLES
@@ -151,7 +156,7 @@ def _build_ssml(voice_name: str, rate: str, text: str) -> str:
     return ssml
 
 
-def _get_speech_config() -> speechsdk.SpeechConfig:
+def _get_speech_config() -> "speechsdk.SpeechConfig":
     """
     Configura el cliente de Azure Cognitive Services Speech.
     
@@ -165,6 +170,8 @@ def _get_speech_config() -> speechsdk.SpeechConfig:
     Lanza:
         RuntimeError: Si no se encuentra la clave de API o la configuracion de region/endpoint
     """
+    import azure.cognitiveservices.speech as speechsdk  # type: ignore
+
     # Obtener la clave de API desde variables de entorno
     key = os.getenv('TTS_AZURE_RESOURCE_KEY')
     # Obtener la region (ej: "eastus", "westus2")
@@ -189,7 +196,38 @@ def _get_speech_config() -> speechsdk.SpeechConfig:
     # Si no hay ni endpoint ni region, lanzar error
     raise RuntimeError('Either TTS_AZURE_REGION or TTS_AZURE_ENDPOINT must be set')
 
-async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT_OUTPUT):
+def _choose_voice(language: str) -> tuple[str, str]:
+    """
+    Elige la voz neural y la velocidad de habla segun el idioma.
+
+    Las voces neurales son modelos de IA entrenados para sonar como humanos.
+
+    Retorna:
+        tuple[str, str]: (nombre de la voz, velocidad para SSML)
+    """
+    if language == 'spanish':
+        print('Spanish detected')
+        # Para espanol, usar velocidad ligeramente mas lenta (15% mas rapido)
+        rate = '+15%'
+        # Seleccionar aleatoriamente una voz espanola neural (modelo de IA)
+        voice_name = random.choice(SPANISH_PREFERRED_VOICES)
+
+    else:  # default = English
+        print('English detected')
+        # Velocidad de habla por defecto (20% mas rapido que normal)
+        rate = '+20%'
+        # Para ingles, usar voces HD (High Definition) de alta calidad
+        # Seleccionar aleatoriamente entre voz masculina o femenina HD
+        voice_name = random.choice([
+            EN_US_MALE_HD_VOICE,
+            EN_US_FEMALE_HD_VOICE
+        ])
+
+    print(f"Using voice: {voice_name}")
+    return voice_name, rate
+
+
+async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT_OUTPUT, timeout: float | None = None):
     """
     Genera audio de voz a partir de texto usando TEXT-TO-SPEECH (TTS) con IA.
     
@@ -202,6 +240,9 @@ async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT
     - Usa voces neurales de alta calidad que suenan naturales
     - Detecta automaticamente el idioma y selecciona la voz apropiada
     
+    Parametros:
+        timeout (float | None): Tiempo maximo de la sintesis en segundos (deadline del job)
+    
     Returns:
         tuple[str, str]: (output_audio_path, normalized_language)
                          normalized_language is 'english' or 'spanish'
@@ -212,11 +253,8 @@ async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT
     # ========================================================================
     # Detectar el idioma del texto usando procesamiento de lenguaje natural
     # Relacion: IA_Clase_02 (Topicos de IA), IA_Clase_06 (Tokens e incrustaciones)
-    language = detect_language(text)
+    script_language = detect_language(text)
     
-    # Velocidad de habla por defecto (20% mas rapido que normal)
-    rate = '+20%'
-
     # ========================================================================
     # LIMPIEZA DEL TEXTO
     # ========================================================================
@@ -226,25 +264,7 @@ async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT
     # ========================================================================
     # SELECCION DE VOZ NEURAL BASADA EN IDIOMA
     # ========================================================================
-    # Las voces neurales son modelos de IA entrenados para sonar como humanos
-    # Se selecciona una voz apropiada para el idioma detectado
-    if language == 'spanish':
-        print('Spanish detected')
-        # Para espanol, usar velocidad ligeramente mas lenta (15% mas rapido)
-        rate = '+15%'
-        # Seleccionar aleatoriamente una voz espanola neural (modelo de IA)
-        voice_name = random.choice(SPANISH_PREFERRED_VOICES)
-
-    else:  # default = English
-        print('English detected')
-        # Para ingles, usar voces HD (High Definition) de alta calidad
-        # Seleccionar aleatoriamente entre voz masculina o femenina HD
-        voice_name = random.choice([
-            EN_US_MALE_HD_VOICE,
-            EN_US_FEMALE_HD_VOICE
-        ])
-
-    print(f"Using voice: {voice_name}")
+    voice_name, rate = _choose_voice(script_language)
 
     # ========================================================================
     # PREPARACION DEL DIRECTORIO DE SALIDA
@@ -255,6 +275,8 @@ async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT
     # ========================================================================
     # CONFIGURACION DEL SERVICIO DE TTS DE AZURE (IA)
     # ========================================================================
+    import azure.cognitiveservices.speech as speechsdk  # type: ignore
+
     # Obtener la configuracion de conexion a Azure Cognitive Services
     speech_config = _get_speech_config()
     
@@ -282,10 +304,18 @@ async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT
     # y genera audio de voz humana sintetica
     # Como el SDK no es completamente asincrono, ejecutamos en un executor
     loop = asyncio.get_running_loop()
-    result = await loop.run_in_executor(
-        None,  # Usar el executor por defecto
-        lambda: synthesizer.speak_ssml_async(ssml).get()  # Ejecutar la sintesis
-    )
+    try:
+        result = await asyncio.wait_for(
+            loop.run_in_executor(
+                None,  # Usar el executor por defecto
+                lambda: synthesizer.speak_ssml_async(ssml).get()  # Ejecutar la sintesis
+            ),
+            timeout=timeout,  # None = sin limite
+        )
+    except asyncio.TimeoutError:
+        # Pedir al SDK que detenga la sintesis para liberar el thread del executor
+        synthesizer.stop_speaking_async()
+        raise TimeoutError(f"Azure TTS synthesis timed out after {timeout:.0f}s")
 
     # ========================================================================
     # VERIFICACION DE RESULTADO
@@ -301,7 +331,150 @@ async def generate_tts(text: str, gender: str = None, output_path: str = DEFAULT
 
     print(f'✅ Audio saved to {output_path}')
     # Retornar la ruta del archivo de audio y el idioma detectado
-    return output_path, language
+    return output_path, script_language
+
+
+# ============================================================================
+# TTS INCREMENTAL (GUION EN STREAMING)
+# ============================================================================
+# Cada fragmento del guion se sintetiza en cuanto llega (mientras el LLM sigue
+# escribiendo) como PCM crudo en memoria; al final los fragmentos se unen en orden
+# en un solo WAV, con una pausa corta entre ellos.
+TTS_STREAM_CONCURRENCY = int(os.getenv("TTS_STREAM_CONCURRENCY", "3"))
+TTS_STREAM_GAP_MS = int(os.getenv("TTS_STREAM_GAP_MS", "150"))
+# Formato de los fragmentos: PCM 16 bits mono a 24 kHz (se puede concatenar sin decodificar)
+_PCM_SAMPLE_RATE = 24000
+_PCM_SAMPLE_WIDTH = 2
+# El idioma se decide con la etiqueta [ES]/[SP]/[EN] o, si no aparece, con al menos
+# estos caracteres del inicio del guion (no solo con el primer fragmento)
+_LANGUAGE_PREFIX_CHARS = 200
+_LANGUAGE_TAG_RE = re.compile(r"\[(?:SP|ES|EN)\]", re.IGNORECASE)
+
+
+def _synthesize_pcm(speech_config, ssml: str) -> bytes:
+    """Sintetiza un documento SSML y retorna el audio PCM en memoria (corre en un executor)."""
+    import azure.cognitiveservices.speech as speechsdk  # type: ignore
+
+    # audio_config=None: el audio queda en result.audio_data en lugar de un archivo
+    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+    result = synthesizer.speak_ssml_async(ssml).get()
+    if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+        details = ""
+        if result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = speechsdk.CancellationDetails(result)
+            details = f" Cancellation reason: {cancellation_details.reason}. Error details: {cancellation_details.error_details}"
+        raise RuntimeError(f"Azure TTS synthesis failed.{details}")
+    return result.audio_data
+
+
+async def generate_tts_streaming(
+    chunks: AsyncIterator[str],
+    gender: str = None,
+    output_path: str = DEFAULT_OUTPUT,
+    timeout: float | None = None,
+) -> tuple[str, str, str]:
+    """
+    Genera el audio a medida que llegan los fragmentos del guion (ver
+    genScript.stream_short_video_script), para que la sintesis se solape con el LLM.
+
+    El idioma y la voz se deciden con el inicio del guion (hasta encontrar la etiqueta
+    [ES]/[EN] o juntar _LANGUAGE_PREFIX_CHARS caracteres). Si algo falla o se acaba
+    el tiempo, se cierra `chunks` (lo que detiene el streaming del LLM).
+
+    Parametros:
+        chunks (AsyncIterator[str]): Fragmentos del guion en orden
+        output_path (str): Ruta del WAV de salida
+        timeout (float | None): Tiempo maximo total en segundos (deadline del job)
+
+    Retorna:
+        tuple[str, str, str]: (ruta del audio, idioma 'english' | 'spanish', guion completo)
+    """
+    import azure.cognitiveservices.speech as speechsdk  # type: ignore
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    speech_config = _get_speech_config()
+    speech_config.set_speech_synthesis_output_format(
+        speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm
+    )
+    semaphore = asyncio.Semaphore(max(1, TTS_STREAM_CONCURRENCY))
+
+    def remaining() -> float | None:
+        return None if deadline is None else max(0.0, deadline - loop.time())
+
+    async def synthesize(ssml: str) -> bytes:
+        async with semaphore:
+            return await loop.run_in_executor(None, _synthesize_pcm, speech_config, ssml)
+
+    parts: list[str] = []
+    # Fragmentos recibidos antes de decidir el idioma
+    prefix: list[str] = []
+    tasks: list[asyncio.Task] = []
+    script_language = voice_name = rate = None
+    started = loop.time()
+
+    def submit(text: str) -> None:
+        if text.strip():
+            ssml = _build_ssml(voice_name=voice_name, rate=rate, text=text.strip())
+            tasks.append(asyncio.create_task(synthesize(ssml)))
+
+    def decide_language() -> None:
+        nonlocal script_language, voice_name, rate
+        head = "".join(prefix)
+        script_language = detect_language(head)
+        voice_name, rate = _choose_voice(script_language)
+        prefix.clear()
+        submit(_strip_leading_language_tag(head))
+
+    chunk_iter = chunks.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunk_iter.__anext__(), timeout=remaining())
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Azure TTS synthesis timed out after {timeout:.0f}s")
+            parts.append(chunk)
+            if script_language is None:
+                prefix.append(chunk)
+                head = "".join(prefix)
+                if _LANGUAGE_TAG_RE.search(head) or len(head) >= _LANGUAGE_PREFIX_CHARS:
+                    decide_language()
+                continue
+            submit(chunk)
+
+        if script_language is None and prefix:
+            decide_language()
+
+        try:
+            pcm_parts = await asyncio.wait_for(asyncio.gather(*tasks), timeout=remaining())
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Azure TTS synthesis timed out after {timeout:.0f}s")
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Detener el productor (streaming del LLM) si sigue vivo
+        aclose = getattr(chunk_iter, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        raise
+
+    script = "".join(parts).strip()
+    if not pcm_parts:
+        return output_path, script_language or "english", script
+
+    # Unir los fragmentos PCM en un WAV con una pausa corta entre oraciones
+    gap = b"\x00" * (_PCM_SAMPLE_RATE * _PCM_SAMPLE_WIDTH * TTS_STREAM_GAP_MS // 1000)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with wave.open(output_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(_PCM_SAMPLE_WIDTH)
+        wav.setframerate(_PCM_SAMPLE_RATE)
+        wav.writeframes(gap.join(pcm_parts))
+
+    print(f'✅ Audio saved to {output_path} ({len(pcm_parts)} fragmento(s), {loop.time() - started:.1f}s)')
+    return output_path, script_language, script
 
 
 def _strip_leading_language_tag(text: str) -> str:
@@ -319,7 +492,8 @@ def detect_language(text: str) -> str:
     - IA_Clase_02 (Topicos de IA): Deteccion de idioma es parte de NLP
     - IA_Clase_06 (Tokens e incrustaciones): El texto se analiza para detectar patrones
     
-    Esta es una forma simple de deteccion basada en etiquetas.
+    Esta es una forma simple de deteccion basada en etiquetas (ver
+    services/language.py, compartido con genScript).
     En produccion, se podria usar un modelo de IA mas sofisticado.
     
     Parametros:
@@ -328,15 +502,8 @@ def detect_language(text: str) -> str:
     Retorna:
         str: 'spanish' o 'english' segun el idioma detectado
     """
-    head = text.strip()[:24].upper()
     # El LLM a veces devuelve [ES]: en lugar de [SP]: — ambos son español
-    if re.match(r"^\[(?:SP|ES)\]", head, re.IGNORECASE):
-        return "spanish"
-    if "[SP]" in text.upper() or "[ES]" in text.upper():
-        return "spanish"
-    if re.match(r"^\[EN\]", head, re.IGNORECASE) or "[EN]" in text.upper():
-        return "english"
-    return "english"
+    return language.detect_script_language(text)
 
 if __name__ == "__main__":
     with open(FILE_PATH, 'r') as file:
@@ -0,0 +1,187 @@
+# ============================================================================
+# DETECCION DE IDIOMA (ESPANOL / INGLES) EN UNA SOLA PASADA
+# ============================================================================
+# Usado por genScript (idioma del guion a partir de la peticion y del PDF) y por
+# genTTS (idioma del guion ya generado, por su etiqueta [ES]/[SP]/[EN]).
+#
+# RELACION CON IA:
+# - IA_Clase_02 (Topicos de IA): Deteccion de idioma es parte de NLP
+# - IA_Clase_06 (Tokens e incrustaciones): el texto se tokeniza en palabras
+#
+# Las palabras frecuentes de los dos idiomas se cuentan en UNA pasada sobre el texto
+# cortado por espacios, con el mismo criterio que el `count(" palabra ")` anterior
+# (solo palabras entre espacios, no saltos de linea, y sin solapes). Antes se hacia
+# un `count` por cada palabra de las listas (decenas de recorridos del texto) mas un
+# recorrido caracter por caracter para las tildes (ahora un `count` por caracter).
+# Ver benchmark_idioma.py para la equivalencia y el tiempo contra la heuristica anterior.
+# ============================================================================
+
+import re
+
+# Caracteres del PDF que se usan como pista del idioma (con esto basta para decidir,
+# no hace falta esperar a que termine la extraccion)
+LANGUAGE_SAMPLE_CHARS = 12000
+# Las tildes/ñ del PDF se cuentan solo en sus primeros caracteres
+_MARKS_WINDOW_CHARS = 8000
+# Las peticiones explicitas de ingles en el PDF solo cuentan al inicio
+_EXPLICIT_ENGLISH_WINDOW_CHARS = 800
+
+_SPANISH_MARKS = "áéíóúñüÁÉÍÓÚÑÜ¿¡"
+
+# Cubren "español", "en español", "guion en español", "castellano"...
+_EXPLICIT_SPANISH = ("español", "espanol", "castellano")
+# Cubren "english", "in english", "script in english", "en inglés"...
+_EXPLICIT_ENGLISH = ("english", "en inglés", "en ingles")
+_SPANISH_REQUEST_RE = re.compile(r"\b(?:hazlo|haz|usa|usar|cuéntame|cuentame|pon|ponme|dime|explicame|explícame)\b")
+_ENGLISH_REQUEST_RE = re.compile(r"\b(?:make|use|tell me|give me|keep it)\b")
+
+# Palabras típicas cuando el usuario escribe la petición en español (aunque el PDF sea inglés)
+SPANISH_USER_WORDS = frozenset((
+    "que", "como", "cómo", "para", "con", "una", "unos", "unas", "los", "las",
+    "más", "mas", "también", "tambien", "este", "esta", "muy", "sobre", "hacer",
+    "haz", "usa", "quiero", "tono", "estilo", "palabras", "palabra", "incluye",
+    "incluir", "explica", "breve", "corto", "divertido", "formal", "educativo",
+    "coloquial", "guion", "guión", "video", "nada", "algo", "así", "asi",
+))
+ENGLISH_USER_WORDS = frozenset((
+    "the", "and", "with", "that", "this", "from", "your", "make", "please", "want",
+    "tone", "style", "keywords", "funny", "serious", "short", "include", "explain",
+    "script",
+))
+SPANISH_PDF_WORDS = frozenset((
+    "el", "la", "de", "que", "los", "las", "una", "con", "por", "para", "como",
+    "más", "mas", "también", "tambien",
+))
+ENGLISH_PDF_WORDS = frozenset((
+    "the", "and", "of", "to", "in", "is", "for", "that", "with", "as", "on", "are",
+    "by", "from",
+))
+
+_SCRIPT_SPANISH_TAG_RE = re.compile(r"\[(?:SP|ES)\]", re.IGNORECASE)
+
+# Deteccion sobre textos cortos (ej: las primeras paginas con OCR): proporciones en
+# vez de los umbrales absolutos de infer_target_script_language (pensados para
+# LANGUAGE_SAMPLE_CHARS caracteres)
+_WORD_RE = re.compile(r"[a-záéíóúñü]+")
+_MIN_DETECT_WORDS = 20
+# Fraccion minima de palabras frecuentes del idioma y ventaja sobre el otro idioma
+_MIN_FUNCTION_WORD_RATIO = 0.05
+_FUNCTION_WORD_MARGIN = 2
+# Tildes/ñ por palabra: desde aqui es español aunque haya pocas palabras frecuentes
+_SPANISH_MARKS_PER_WORD = 0.05
+
+# Palabra -> indice del idioma (0 = español, 1 = ingles) para contar ambos en una pasada
+_USER_WORD_LANGUAGE = {**{w: 0 for w in SPANISH_USER_WORDS}, **{w: 1 for w in ENGLISH_USER_WORDS}}
+_PDF_WORD_LANGUAGE = {**{w: 0 for w in SPANISH_PDF_WORDS}, **{w: 1 for w in ENGLISH_PDF_WORDS}}
+
+
+def _explicit(text: str, phrases: tuple) -> bool:
+    return any(p in text for p in phrases)
+
+
+def spanish_marks(text: str) -> int:
+    """Cantidad de tildes, ñ, ü y signos ¿¡ del texto."""
+    return sum(map(text.count, _SPANISH_MARKS))
+
+
+def _count_words(text: str, word_language: dict) -> list[int]:
+    """
+    Cuantas palabras de cada idioma tiene el texto, igual que sumar `count(" palabra ")`
+    sobre " texto ": solo cuentan palabras entre espacios (una palabra pegada a un
+    salto de linea no cuenta) y una palabra repetida seguida ("la la") cuenta una vez
+    por cada par, porque dos apariciones seguidas comparten el espacio.
+    """
+    counts = [0, 0]
+    previous = None  # Ultima palabra contada si es la inmediatamente anterior
+    for word in f" {text} ".split(" "):
+        index = word_language.get(word)
+        if index is None or word == previous:
+            previous = None
+            continue
+        counts[index] += 1
+        previous = word
+    return counts
+
+
+def infer_target_script_language(pdf_text: str, user_additional_input: str | None) -> str:
+    """
+    Decide si el guion debe ir en español, inglés o dejar que el modelo elija (auto).
+
+    Regla principal: el idioma de la PETICIÓN del usuario manda sobre el idioma del PDF.
+    Solo si el usuario no escribió nada útil se usa el PDF como pista.
+
+    Retorna:
+        str: "spanish" | "english" | "auto"
+    """
+    user = (user_additional_input or "").strip().lower()
+
+    if user:
+        explicit_es = _explicit(user, _EXPLICIT_SPANISH)
+        explicit_en = _explicit(user, _EXPLICIT_ENGLISH)
+        if explicit_es and not explicit_en:
+            return "spanish"
+        if explicit_en and not explicit_es:
+            return "english"
+        # Cualquier tilde / ñ en la petición → español (pide en español aunque el PDF sea otro idioma)
+        if spanish_marks(user):
+            return "spanish"
+        sp_u, en_u = _count_words(user, _USER_WORD_LANGUAGE)
+        if len(user) >= 4 and sp_u > en_u:
+            return "spanish"
+        if len(user) >= 4 and en_u > sp_u:
+            return "english"
+        # Imperativos / frases muy comunes en español
+        if _SPANISH_REQUEST_RE.search(user):
+            return "spanish"
+        if sp_u == 0 and _ENGLISH_REQUEST_RE.search(user):
+            return "english"
+        # Petición escrita pero empate (poco texto mezclado): no dejar que el PDF pise al usuario
+        return "auto"
+
+    # Sin texto del usuario: inferir idioma solo del PDF
+    sample = (pdf_text or "")[:LANGUAGE_SAMPLE_CHARS].lower()
+    if _explicit(sample, _EXPLICIT_SPANISH) and not _explicit(sample[:_EXPLICIT_ENGLISH_WINDOW_CHARS], _EXPLICIT_ENGLISH):
+        return "spanish"
+
+    # Las tildes se cuentan en los primeros caracteres; las palabras, en toda la muestra
+    marks = spanish_marks((pdf_text or "")[:_MARKS_WINDOW_CHARS])
+    sp_pdf, en_pdf = _count_words(sample, _PDF_WORD_LANGUAGE)
+
+    if marks >= 8 or sp_pdf >= 22:
+        return "spanish"
+    if en_pdf >= 35 and marks < 4:
+        return "english"
+    return "auto"
+
+
+def detect_text_language(text: str) -> str:
+    """
+    Idioma de un texto corto (cualquier separador, ej: texto de OCR) segun la
+    proporcion de palabras frecuentes y de tildes, sin umbrales absolutos.
+
+    Retorna:
+        str: "spanish" | "english" | "auto" (poco texto o sin un idioma claro)
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < _MIN_DETECT_WORDS:
+        return "auto"
+    sp = sum(1 for w in words if w in SPANISH_PDF_WORDS)
+    en = sum(1 for w in words if w in ENGLISH_PDF_WORDS)
+    marks_per_word = spanish_marks(text) / len(words)
+
+    if sp >= _FUNCTION_WORD_MARGIN * en and sp >= _MIN_FUNCTION_WORD_RATIO * len(words):
+        return "spanish"
+    if marks_per_word >= _SPANISH_MARKS_PER_WORD and sp >= en:
+        return "spanish"
+    if (en >= _FUNCTION_WORD_MARGIN * sp and en >= _MIN_FUNCTION_WORD_RATIO * len(words)
+            and marks_per_word < _SPANISH_MARKS_PER_WORD / 2):
+        return "english"
+    return "auto"
+
+
+def detect_script_language(text: str) -> str:
+    """
+    Idioma de un guion generado segun su etiqueta: [ES]: o [SP]: (en cualquier parte,
+    el LLM a veces pone una u otra) es español; cualquier otro caso, inglés.
+    """
+    return "spanish" if _SCRIPT_SPANISH_TAG_RE.search(text) else "english"
@@ -0,0 +1,325 @@
+# ============================================================================
+# SERVICIO DE OCR EN PARALELO (POOL DE PROCESOS)
+# ============================================================================
+# OCR (Reconocimiento Optico de Caracteres) de paginas de PDFs escaneados.
+# RELACION CON IA:
+# - IA_Clase_01 (Fundamentos de IA): OCR es una aplicacion basica de IA
+# - IA_Clase_02 (Topicos de IA): Vision por computadora / reconocimiento de texto
+#
+# Cada pagina se rasteriza (PyMuPDF) y se pasa a Tesseract en un POOL DE PROCESOS
+# compartido por todos los jobs del servidor. Los resultados se devuelven en el
+# orden de las paginas y el numero de paginas en vuelo esta acotado para limitar
+# la memoria maxima.
+#
+# Rasterizado: los pixeles del pixmap se entregan directo a PIL/Tesseract (sin
+# codificar/decodificar PNG), con DPI configurable y render en escala de grises
+# (opcionalmente binarizado). Benchmark: python benchmark_ocr.py <pdf>
+#
+# Idioma: "eng+spa" obliga a Tesseract a evaluar dos modelos por pagina. Con
+# OCR_LANG_MODE=auto las primeras OCR_DETECT_PAGES paginas se reconocen con
+# ambos, se detecta el idioma de su texto (services/language.py, por proporcion de
+# palabras frecuentes: son pocas paginas) y el resto va con un solo modelo; si el
+# idioma no queda claro se sigue con "eng+spa".
+# Una pagina con confianza menor a OCR_MIN_CONFIDENCE se repite con "eng+spa".
+# ============================================================================
+
+# ============================================================================
+# IMPORTACIONES
+# ============================================================================
+import os  # Para variables de entorno y numero de CPUs
+import time  # Para medir el tiempo de OCR de cada pagina
+import threading  # Lock para crear el pool una sola vez
+import multiprocessing  # Contexto "spawn" para los procesos del pool
+from collections import deque  # Ventana de paginas en vuelo (en orden)
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Tuple
+
+from services import language  # Deteccion del idioma del documento (eng / spa)
+from utils import metrics
+
+# PyMuPDF (fitz), pytesseract y Pillow se importan al hacer OCR (en los procesos
+# del pool), no al arrancar el servidor
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF - Para convertir paginas de PDF en imagenes
+    from PIL import Image  # Pillow - Para procesar imagenes
+
+_tesserocr = None
+_tesserocr_checked = False
+
+
+def get_tesserocr():
+    """
+    tesserocr (opcional): API en C de Tesseract, recibe los pixeles en memoria sin
+    pasar por archivos temporales. Retorna None si no esta instalado (se usa pytesseract).
+    """
+    global _tesserocr, _tesserocr_checked
+    if not _tesserocr_checked:
+        try:
+            import tesserocr  # type: ignore
+            _tesserocr = tesserocr
+        except ImportError:
+            _tesserocr = None
+        _tesserocr_checked = True
+    return _tesserocr
+
+# ============================================================================
+# CONFIGURACION DEL POOL
+# ============================================================================
+# OCR_WORKERS: procesos del pool (por defecto, CPUs - 1, minimo 1)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# OCR_MAX_PAGES_IN_FLIGHT: paginas enviadas al pool sin recoger (acota la memoria)
+OCR_MAX_PAGES_IN_FLIGHT = int(os.getenv("OCR_MAX_PAGES_IN_FLIGHT", str(OCR_WORKERS * 2)))
+# Idiomas de Tesseract: ingles + espanol (modo combinado, y fallback del modo auto)
+OCR_LANG = "eng+spa"
+# OCR_LANG_MODE: auto (un solo idioma despues de detectarlo) | combined (siempre eng+spa)
+OCR_LANG_MODE = os.getenv("OCR_LANG_MODE", "auto").strip().lower()
+# Paginas que se reconocen con eng+spa para detectar el idioma del documento
+OCR_DETECT_PAGES = int(os.getenv("OCR_DETECT_PAGES", "2"))
+# Confianza media (0-100) por debajo de la cual la pagina se repite con eng+spa
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "60"))
+# Modelo de Tesseract de cada idioma detectado
+OCR_LANGUAGE_CODES = {"spanish": "spa", "english": "eng"}
+
+# ============================================================================
+# CONFIGURACION DEL RASTERIZADO
+# ============================================================================
+# OCR_DPI: resolucion del render. Por defecto 72 (la misma del render anterior):
+# subirla puede mejorar el texto de escaneos de baja calidad, pero Tesseract tarda
+# mas con imagenes grandes. Medir con benchmark_ocr.py antes de subirla.
+OCR_DPI = int(os.getenv("OCR_DPI", "72"))
+# OCR_GRAYSCALE: renderizar en escala de grises (1 byte por pixel en lugar de 3)
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "1") == "1"
+# OCR_BINARIZE: umbral 0-255 para binarizar la imagen (0 = no binarizar)
+OCR_BINARIZE = int(os.getenv("OCR_BINARIZE", "0"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+# Documento abierto en cada proceso del pool (se reusa entre paginas del mismo PDF)
+_worker_doc: Tuple[str, "fitz.Document"] | None = None
+# APIs de tesserocr por idioma en cada proceso del pool (cargar el modelo es caro)
+_worker_tess_apis: dict = {}
+
+
+def _init_worker() -> None:
+    """Inicializa un proceso del pool."""
+    # Tesseract usa OpenMP: con varios procesos en paralelo, un hilo por proceso
+    # evita sobre-suscribir las CPUs
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _open_worker_doc(pdf_path: str) -> "fitz.Document":
+    """Abre (o reusa) el PDF dentro del proceso del pool."""
+    global _worker_doc
+    import fitz  # PyMuPDF
+
+    if _worker_doc is None or _worker_doc[0] != pdf_path:
+        if _worker_doc is not None:
+            _worker_doc[1].close()
+        _worker_doc = (pdf_path, fitz.open(pdf_path))
+    return _worker_doc[1]
+
+
+def render_page_image(
+    page: "fitz.Page",
+    dpi: int = OCR_DPI,
+    grayscale: bool = OCR_GRAYSCALE,
+    binarize: int = OCR_BINARIZE,
+) -> Tuple["Image.Image", "fitz.Pixmap"]:
+    """
+    Rasteriza una pagina y envuelve los pixeles del pixmap en una imagen PIL sin copiarlos.
+
+    Parametros:
+        page (fitz.Page): Pagina de PyMuPDF
+        dpi (int): Resolucion del render
+        grayscale (bool): Renderizar en escala de grises
+        binarize (int): Umbral 0-255 para binarizar (0 = no binarizar)
+
+    Retorna:
+        tuple[Image, Pixmap]: La imagen y el pixmap (que debe seguir vivo mientras se use la imagen)
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    colorspace = fitz.csGRAY if (grayscale or binarize) else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+
+    # Image.frombuffer comparte la memoria del pixmap (sin PNG de por medio)
+    mode = "L" if pix.n == 1 else "RGB"
+    samples = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+    image = Image.frombuffer(mode, (pix.width, pix.height), samples, "raw", mode, pix.stride, 1)
+
+    if binarize:
+        image = image.point(lambda p: 255 if p >= binarize else 0, mode="1")
+    return image, pix
+
+
+def _recognize(image: "Image.Image", lang: str) -> Tuple[str, Optional[float]]:
+    """
+    Reconoce el texto de una imagen con tesserocr (si esta instalado) o pytesseract.
+
+    Retorna:
+        tuple[str, float | None]: Texto y confianza media de las palabras (0-100;
+            None si no se reconocio ninguna palabra)
+    """
+    tesserocr = get_tesserocr()
+    if tesserocr is not None:
+        api = _worker_tess_apis.get(lang)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=lang)
+            _worker_tess_apis[lang] = api
+        gray = image if image.mode == "L" else image.convert("L")
+        # Pixeles en memoria directo a Tesseract (1 byte por pixel)
+        api.SetImageBytes(gray.tobytes(), gray.width, gray.height, 1, gray.width)
+        text = api.GetUTF8Text()
+        return text, (float(api.MeanTextConf()) if text.strip() else None)
+
+    # Tesseract OCR via linea de comandos: image_to_data da el texto y la confianza
+    # de cada palabra en una sola pasada; las lineas y parrafos se rearman en orden
+    import pytesseract
+
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    paragraphs: dict = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if conf < 0 or not word.strip():
+            continue
+        paragraph = paragraphs.setdefault((data["block_num"][i], data["par_num"][i]), {})
+        paragraph.setdefault(data["line_num"][i], []).append(word)
+        confidences.append(conf)
+    text = "\n\n".join(
+        "\n".join(" ".join(words) for words in lines.values()) for lines in paragraphs.values()
+    )
+    return text, (sum(confidences) / len(confidences) if confidences else None)
+
+
+def ocr_page(pdf_path: str, page_num: int, lang: str = OCR_LANG) -> dict:
+    """
+    Rasteriza una pagina del PDF y reconoce su texto con Tesseract.
+    Se ejecuta dentro de un proceso del pool.
+
+    Parametros:
+        pdf_path (str): Ruta al PDF
+        page_num (int): Indice de la pagina (desde 0)
+        lang (str): Modelo(s) de Tesseract ("spa", "eng" o "eng+spa")
+
+    Retorna:
+        dict: {"text", "lang" (modelo usado), "confidence", "fallback" (se repitio
+               con eng+spa por baja confianza), "seconds"}
+    """
+    started = time.perf_counter()
+    page = _open_worker_doc(pdf_path).load_page(page_num)
+    image, pix = render_page_image(page)
+
+    text, confidence = _recognize(image, lang)
+    fallback = False
+    if lang != OCR_LANG and confidence is not None and confidence < OCR_MIN_CONFIDENCE:
+        # Un solo idioma no alcanzo (pagina en otro idioma o mezclada): eng+spa
+        text, confidence = _recognize(image, OCR_LANG)
+        lang, fallback = OCR_LANG, True
+    del image, pix
+    return {
+        "text": text,
+        "lang": lang,
+        "confidence": confidence,
+        "fallback": fallback,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Devuelve el pool de procesos de OCR (se crea en el primer uso y se reusa entre jobs)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" evita heredar por fork los threads y sockets del servidor
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            print(f"🧵 Pool de OCR iniciado con {OCR_WORKERS} proceso(s)")
+        return _pool
+
+
+def shutdown_ocr_pool() -> None:
+    """Cierra el pool de OCR (al apagar el servidor)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _detect_ocr_lang(sample: str) -> str:
+    """Modelo de Tesseract para el resto del documento segun el texto de las primeras paginas."""
+    # Sin un idioma claro ("auto") se sigue con los dos modelos: el idioma que pide
+    # el usuario para el guion no dice nada del idioma del documento escaneado
+    detected = language.detect_text_language(sample)
+    metrics.incr(f"ocr.detected.{detected}")
+    lang = OCR_LANGUAGE_CODES.get(detected, OCR_LANG)
+    print(f"🔤 Idioma del OCR: {lang} (deteccion: {detected})")
+    return lang
+
+
+def ocr_pages(pdf_path: str, page_numbers: Iterable[int]) -> Iterator[Tuple[int, dict]]:
+    """
+    Aplica OCR a varias paginas en paralelo y las entrega EN ORDEN.
+
+    Como maximo OCR_MAX_PAGES_IN_FLIGHT paginas estan enviadas al pool a la vez:
+    la siguiente pagina se envia solo cuando se entrega la mas antigua. Con
+    OCR_LANG_MODE=auto, despues de las primeras OCR_DETECT_PAGES paginas (eng+spa)
+    se espera a detectar el idioma antes de enviar las demas con un solo modelo.
+
+    Parametros:
+        pdf_path (str): Ruta al PDF
+        page_numbers (Iterable[int]): Indices de las paginas a procesar (en orden)
+
+    Retorna:
+        Iterator[tuple[int, dict]]: Pares (indice de pagina, resultado de ocr_page)
+    """
+    pool = get_ocr_pool()
+    pending = iter(page_numbers)
+    in_flight: deque = deque()
+    detecting = OCR_LANG_MODE == "auto" and OCR_DETECT_PAGES > 0
+    lang = OCR_LANG
+    submitted = 0
+    detection_texts: list = []
+
+    def submit_next() -> bool:
+        nonlocal submitted
+        if detecting and submitted >= OCR_DETECT_PAGES:
+            return False  # Esperar a conocer el idioma
+        page_num = next(pending, None)
+        if page_num is None:
+            return False
+        in_flight.append((page_num, pool.submit(ocr_page, pdf_path, page_num, lang)))
+        submitted += 1
+        return True
+
+    def fill_window() -> None:
+        while len(in_flight) < max(1, OCR_MAX_PAGES_IN_FLIGHT) and submit_next():
+            pass
+
+    fill_window()
+    try:
+        while in_flight:
+            page_num, future = in_flight.popleft()
+            result = future.result()
+            metrics.observe(f"ocr.page_seconds.{result['lang']}", result["seconds"])
+            if result["confidence"] is not None:
+                metrics.observe("ocr.confidence", result["confidence"])
+            if result["fallback"]:
+                metrics.incr("ocr.lang_fallbacks")
+            if detecting:
+                detection_texts.append(result["text"])
+                if not in_flight:
+                    lang = _detect_ocr_lang("\n\n".join(detection_texts))
+                    detecting = False
+            fill_window()
+            yield page_num, result
+    finally:
+        # Si el consumidor se detiene antes, no dejar trabajo huerfano en el pool
+        for _, future in in_flight:
+            future.cancel()
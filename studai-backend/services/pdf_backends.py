@@ -0,0 +1,275 @@
+# ============================================================================
+# BACKENDS DE EXTRACCION DE TEXTO DE PDFs
+# ============================================================================
+# Tres implementaciones intercambiables de la capa de texto de un PDF:
+# - PyMuPDF (fitz): escrito en C, normalmente el mas rapido
+# - pypdf: Python puro, sucesor de PyPDF2
+# - PyPDF2: Python puro (el extractor historico del proyecto)
+#
+# El backend se elige con PDF_TEXT_BACKEND (pymupdf | pypdf | pypdf2) o, con
+# PDF_TEXT_BACKEND=auto (por defecto), con un micro-benchmark en el primer uso
+# (la primera extraccion, no al arrancar el servidor): se genera un PDF de muestra,
+# se mide cada backend disponible y se usa el mas rapido que extrae correctamente
+# el texto de muestra.
+# ============================================================================
+
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+from utils import metrics
+
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "auto").strip().lower()
+
+# Orden de preferencia si no se puede hacer el benchmark
+BACKEND_PREFERENCE = ("pymupdf", "pypdf", "pypdf2")
+
+# Texto de muestra del micro-benchmark (espanol e ingles, con acentos)
+_SAMPLE_LINES = (
+    "La inteligencia artificial estudia agentes que perciben y actúan.",
+    "Los modelos de lenguaje generan texto a partir de tokens.",
+    "Artificial intelligence studies agents that perceive and act.",
+    "Language models generate text from tokens and embeddings.",
+)
+_SAMPLE_PAGES = 8
+# Fraccion minima de palabras de muestra que un backend debe recuperar
+_MIN_QUALITY = 0.9
+
+
+class PdfDocument:
+    """Documento abierto por un backend: numero de paginas, texto e imagenes de cada pagina."""
+
+    def __init__(self, page_count: int, page_text: Callable[[int], str],
+                 page_has_images: Callable[[int], bool]):
+        self.page_count = page_count
+        self._page_text = page_text
+        self._page_has_images = page_has_images
+
+    def page_text(self, page_num: int) -> str:
+        """Texto de la capa de texto de una pagina ('' si no tiene o falla)."""
+        try:
+            return self._page_text(page_num) or ""
+        except Exception:
+            return ""
+
+    def page_has_images(self, page_num: int) -> bool:
+        """True si la pagina tiene imagenes (o si no se puede saber: mejor pasar por OCR)."""
+        try:
+            return bool(self._page_has_images(page_num))
+        except Exception:
+            return True
+
+
+def _resources_have_images(page) -> bool:
+    """Imagenes en los recursos de una pagina de pypdf / PyPDF2 (incluye formularios anidados)."""
+    pending = [page.get("/Resources")]
+    seen = set()
+    while pending:
+        resources = pending.pop()
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        xobjects = resources.get("/XObject")
+        if xobjects is None:
+            continue
+        for ref in xobjects.get_object().values():
+            # Los formularios pueden compartirse entre paginas o referenciarse en ciclo
+            ref_id = getattr(ref, "idnum", None) or id(ref)
+            if ref_id in seen:
+                continue
+            seen.add(ref_id)
+            xobject = ref.get_object()
+            if xobject.get("/Subtype") == "/Image":
+                return True
+            if xobject.get("/Subtype") == "/Form":
+                pending.append(xobject.get("/Resources"))
+    return False
+
+
+class PdfTextBackend(ABC):
+    """Interfaz de un backend de extraccion de texto."""
+
+    name = ""
+
+    @abstractmethod
+    def available(self) -> bool:
+        """True si la biblioteca del backend esta instalada."""
+
+    @abstractmethod
+    def open(self, pdf_path: str) -> ContextManager[PdfDocument]:
+        """Abre el PDF (lanza FileNotFoundError si no existe); usar con `with`."""
+
+
+class PyMuPDFBackend(PdfTextBackend):
+    name = "pymupdf"
+
+    def available(self) -> bool:
+        try:
+            import fitz  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def open(self, pdf_path: str) -> Iterator[PdfDocument]:
+        import fitz
+
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(pdf_path)
+        doc = fitz.open(pdf_path)
+        try:
+            yield PdfDocument(
+                len(doc),
+                lambda i: doc.load_page(i).get_text(),
+                lambda i: bool(doc.load_page(i).get_images()),
+            )
+        finally:
+            doc.close()
+
+
+class PypdfBackend(PdfTextBackend):
+    name = "pypdf"
+
+    def available(self) -> bool:
+        try:
+            import pypdf  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def open(self, pdf_path: str) -> Iterator[PdfDocument]:
+        from pypdf import PdfReader
+
+        with open(pdf_path, "rb") as f:
+            reader = PdfReader(f)
+            yield PdfDocument(
+                len(reader.pages),
+                lambda i: reader.pages[i].extract_text(),
+                lambda i: _resources_have_images(reader.pages[i]),
+            )
+
+
+class PyPDF2Backend(PdfTextBackend):
+    name = "pypdf2"
+
+    def available(self) -> bool:
+        try:
+            import PyPDF2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def open(self, pdf_path: str) -> Iterator[PdfDocument]:
+        from PyPDF2 import PdfReader
+
+        with open(pdf_path, "rb") as f:
+            reader = PdfReader(f)
+            yield PdfDocument(
+                len(reader.pages),
+                lambda i: reader.pages[i].extract_text(),
+                lambda i: _resources_have_images(reader.pages[i]),
+            )
+
+
+BACKENDS: Dict[str, PdfTextBackend] = {
+    backend.name: backend for backend in (PyMuPDFBackend(), PypdfBackend(), PyPDF2Backend())
+}
+
+_selected: Optional[PdfTextBackend] = None
+_select_lock = threading.Lock()
+
+
+def _write_sample_pdf() -> Optional[str]:
+    """Genera el PDF de muestra del benchmark con PyMuPDF (None si no esta instalado)."""
+    try:
+        import fitz
+    except ImportError:
+        return None
+
+    doc = fitz.open()
+    for _ in range(_SAMPLE_PAGES):
+        page = doc.new_page()
+        y = 72
+        for _ in range(6):
+            for line in _SAMPLE_LINES:
+                page.insert_text((72, y), line, fontsize=10)
+                y += 14
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(doc.tobytes())
+    doc.close()
+    return path
+
+
+def _quality(text: str) -> float:
+    """Fraccion de las palabras de muestra que aparecen en el texto extraido."""
+    expected = {w.strip(".,").lower() for line in _SAMPLE_LINES for w in line.split()}
+    found = set(text.lower().replace(".", " ").replace(",", " ").split())
+    return len(expected & found) / len(expected)
+
+
+def benchmark_backends() -> List[Dict]:
+    """
+    Mide cada backend disponible sobre el PDF de muestra.
+
+    Retorna:
+        list[dict]: {"backend", "seconds", "quality"} por backend, del mas rapido al mas lento
+    """
+    sample = _write_sample_pdf()
+    if sample is None:
+        return []
+    results = []
+    try:
+        for backend in BACKENDS.values():
+            if not backend.available():
+                continue
+            try:
+                start = time.perf_counter()
+                with backend.open(sample) as doc:
+                    text = " ".join(doc.page_text(i) for i in range(doc.page_count))
+                seconds = time.perf_counter() - start
+            except Exception as e:
+                print(f"⚠️  Backend de PDF {backend.name} fallo en el benchmark: {e}")
+                continue
+            results.append({"backend": backend.name, "seconds": seconds, "quality": _quality(text)})
+    finally:
+        os.remove(sample)
+    return sorted(results, key=lambda r: r["seconds"])
+
+
+def _select_backend() -> PdfTextBackend:
+    if PDF_TEXT_BACKEND in BACKENDS:
+        backend = BACKENDS[PDF_TEXT_BACKEND]
+        if backend.available():
+            return backend
+        print(f"⚠️  PDF_TEXT_BACKEND={PDF_TEXT_BACKEND} no esta instalado, seleccionando otro...")
+
+    for result in benchmark_backends():
+        print(
+            f"   📊 {result['backend']}: {result['seconds'] * 1000:.1f} ms, "
+            f"calidad {result['quality']:.0%}"
+        )
+        if result["quality"] >= _MIN_QUALITY:
+            return BACKENDS[result["backend"]]
+
+    for name in BACKEND_PREFERENCE:
+        if BACKENDS[name].available():
+            return BACKENDS[name]
+    raise RuntimeError("No PDF text backend is installed (PyMuPDF, pypdf or PyPDF2).")
+
+
+def get_backend() -> PdfTextBackend:
+    """Backend de extraccion seleccionado (se elige una vez por proceso)."""
+    global _selected
+    with _select_lock:
+        if _selected is None:
+            _selected = _select_backend()
+            metrics.incr(f"pdf_backend.selected.{_selected.name}")
+            print(f"📄 Backend de extraccion de texto de PDFs: {_selected.name}")
+        return _selected
@@ -17,22 +17,40 @@ import os  # Para operaciones del sistema de archivos y variables de entorno
 import random  # Para seleccionar segmentos aleatorios del video
 import subprocess  # Para ejecutar comandos externos (ffmpeg)
 import shutil  # Para buscar ejecutables en el PATH del sistema
-from typing import Tuple  # Para tipado: indica que una funcion retorna una tupla
+import time  # Para medir el tiempo de la transcripcion
+from typing import TYPE_CHECKING, Tuple  # Para tipado: indica que una funcion retorna una tupla
 
-# MoviePy: Biblioteca para edicion de video (NO es IA, es procesamiento de video)
-from moviepy import VideoFileClip, AudioFileClip
+from utils.deadline import Deadline, DeadlineExceeded, timeout_for  # Presupuesto de tiempo del job
+from utils import providers  # Registro de clientes compartidos
 
+# MoviePy: Biblioteca para edicion de video (NO es IA, es procesamiento de video)
 # AssemblyAI: Servicio de IA para transcripcion de audio (Speech-to-Text)
 # Relacion: IA_Clase_02 (Topicos de IA), IA_Clase_05 (Modelos de Lenguaje)
-import assemblyai as aai
+# Ambas se importan en el primer uso: cargarlas en el arranque retrasa /health
+if TYPE_CHECKING:
+    from moviepy import VideoFileClip
 
-# ============================================================================
-# CONFIGURACION DE ASSEMBLYAI (SERVICIO DE IA PARA TRANSCRIPCION)
-# ============================================================================
-# AssemblyAI usa modelos de IA para convertir audio hablado en texto
-# Esta configuracion se usa solo si se llama la funcion transcribe_audio()
-# (que actualmente NO se usa en el flujo principal)
-aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+
+def _build_assemblyai():
+    """
+    Importa y configura AssemblyAI en el primer uso.
+
+    AssemblyAI usa modelos de IA para convertir audio hablado en texto.
+    Se usa solo si se llama la funcion transcribe_audio().
+    """
+    import assemblyai as aai
+
+    aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+    aai.settings.http_timeout = providers.PROVIDER_READ_TIMEOUT
+    return aai
+
+
+providers.register("assemblyai", _build_assemblyai)
+
+
+def _assemblyai():
+    """Modulo de AssemblyAI ya configurado (ver utils/providers.py)."""
+    return providers.get("assemblyai")
 
 # ============================================================================
 # CONFIGURACION DE FUENTES Y DIRECTORIOS
@@ -40,8 +58,12 @@ aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
 FONTS_DIR = "assets/fonts"  # Directorio donde estan las fuentes para subtitulos
 DEFAULT_FONT_NAME = "Gilroy-Bold"  # Fuente por defecto para subtitulos
 
+# Timeouts por defecto de cada etapa (se recortan con el deadline del job si existe)
+TRANSCRIBE_TIMEOUT = 180  # Transcripcion con AssemblyAI
+FFMPEG_TIMEOUT = 300      # Quemado de subtitulos con FFmpeg
+
 
-def videoEditor(video_path: str, audio_path: str, language: str, output_path: str | None = None) -> str:
+def videoEditor(video_path: str, audio_path: str, language: str, output_path: str | None = None, deadline: Deadline | None = None) -> str:
     """
     Editor de video simplificado que combina video base con audio generado.
     
@@ -59,12 +81,14 @@ def videoEditor(video_path: str, audio_path: str, language: str, output_path: st
         audio_path (str): Ruta al archivo de audio generado por TTS
         language (str): Idioma del audio ('spanish' o 'english') - no se usa actualmente
         output_path (str | None): Ruta donde guardar el video final (opcional)
+        deadline (Deadline | None): Deadline del job; cada etapa lo revisa y lo usa como timeout
     
     Retorna:
         str: Ruta del MP4 generado (sin subtitulos)
     
     Lanza:
         FileNotFoundError: Si el archivo de audio no existe
+        DeadlineExceeded: Si el job ya no puede terminar a tiempo
     """
     # ========================================================================
     # VALIDACION DE ARCHIVOS
@@ -104,6 +128,8 @@ def videoEditor(video_path: str, audio_path: str, language: str, output_path: st
     # - Recorta a formato vertical
     # - Sincroniza el audio
     # - Exporta el video final
+    if deadline is not None:
+        deadline.check("render")
     print(f"🎬 Generando video sin subtítulos...")
     base_edit_export(video_path, audio_path, temp_video_path)
     print(f"✅ Video generado: {temp_video_path}")
@@ -129,7 +155,9 @@ def videoEditor(video_path: str, audio_path: str, language: str, output_path: st
         
         # Transcribir audio usando IA (AssemblyAI)
         print(f"   🎤 Transcribiendo audio con AssemblyAI...")
-        text, words = transcribe_audio(audio_path, language)
+        text, words = transcribe_audio(
+            audio_path, language, timeout=timeout_for(deadline, TRANSCRIBE_TIMEOUT, "transcription")
+        )
         
         if not words or len(words) == 0:
             print(f"⚠️  No se obtuvieron palabras de la transcripción. Saltando subtítulos...")
@@ -167,10 +195,16 @@ def videoEditor(video_path: str, audio_path: str, language: str, output_path: st
         # Quemar subtítulos en el video usando FFmpeg
         print(f"🔥 Quemando subtítulos en el video con FFmpeg...")
         final_video_with_subs = output_path if output_path else os.path.join("output/videos", f"{final_basename}_final.mp4")
-        burn_subtitles_ffmpeg(temp_video_path, ass_path, final_video_with_subs, FONTS_DIR)
+        burn_subtitles_ffmpeg(
+            temp_video_path, ass_path, final_video_with_subs, FONTS_DIR,
+            timeout=timeout_for(deadline, FFMPEG_TIMEOUT, "ffmpeg")
+        )
         print(f"✅ Video con subtítulos generado: {final_video_with_subs}")
         
         return final_video_with_subs
+    except DeadlineExceeded:
+        # Sin tiempo para terminar: abandonar el job en lugar de seguir trabajando
+        raise
     except Exception as subtitle_error:
         print(f"⚠️  Error al generar subtítulos: {subtitle_error}")
         print(f"   Continuando sin subtítulos...")
@@ -202,6 +236,8 @@ def base_edit_export(video_path: str, audio_path: str, temp_output: str) -> None
         audio_path (str): Ruta al archivo de audio
         temp_output (str): Ruta donde guardar el video editado
     """
+    from moviepy import AudioFileClip
+
     # Cargar el archivo de audio usando MoviePy
     audio = AudioFileClip(audio_path)
     # Obtener la duracion del audio en segundos
@@ -231,7 +267,7 @@ def base_edit_export(video_path: str, audio_path: str, temp_output: str) -> None
     )
 
 
-def extract_random_video_clip(video_path: str, duration: float) -> VideoFileClip:
+def extract_random_video_clip(video_path: str, duration: float) -> "VideoFileClip":
     """
     Extrae un segmento aleatorio del video de una duracion especifica.
     
@@ -247,6 +283,8 @@ def extract_random_video_clip(video_path: str, duration: float) -> VideoFileClip
     Lanza:
         ValueError: Si el video es mas corto que la duracion requerida
     """
+    from moviepy import VideoFileClip
+
     # Cargar el video completo
     video = VideoFileClip(video_path)
     
@@ -265,7 +303,7 @@ def extract_random_video_clip(video_path: str, duration: float) -> VideoFileClip
     return video.subclipped(start_time, start_time + duration)
 
 
-def crop_to_vertical(video_clip: VideoFileClip) -> VideoFileClip:
+def crop_to_vertical(video_clip: "VideoFileClip") -> "VideoFileClip":
     """
     Recorta el video a formato vertical 9:16 (para redes sociales).
     
@@ -310,7 +348,7 @@ def crop_to_vertical(video_clip: VideoFileClip) -> VideoFileClip:
         raise ValueError("The video is too narrow to be cropped to vertical format.")
 
 
-def transcribe_audio(audio_path: str, language: str) -> Tuple[str, list]:
+def transcribe_audio(audio_path: str, language: str, timeout: float | None = None) -> Tuple[str, list]:
     """
     Transcribe audio a texto usando SPEECH-TO-TEXT (STT) con IA.
     
@@ -325,6 +363,9 @@ def transcribe_audio(audio_path: str, language: str) -> Tuple[str, list]:
     
     NOTA: Esta funcion esta implementada pero NO se usa actualmente en el flujo principal.
     Si se quisiera agregar subtitulos, se llamaria esta funcion.
+    
+    Parametros:
+        timeout (float | None): Tiempo maximo de espera de la transcripcion en segundos
     """
     # Verificar que la clave de API este configurada
     api_key = os.getenv("ASSEMBLYAI_API_KEY")
@@ -335,15 +376,19 @@ def transcribe_audio(audio_path: str, language: str) -> Tuple[str, list]:
     print(f"   🌐 Language: {language} -> {map_language(language)}")
     print(f"   📁 Audio file: {audio_path}")
     
+    aai = _assemblyai()
+
     # Mapear idioma al codigo que AssemblyAI requiere
     language_code = map_language(language)
     # Inicializar el transcriber (componente de IA)
     transcriber = aai.Transcriber()
     
     print(f"   ⏳ Starting transcription...")
-    # LLAMADA A LA IA: Enviar audio para transcripcion
+    started = time.monotonic()
+    # LLAMADA A LA IA: Enviar audio para transcripcion (submit no bloquea hasta terminar,
+    # asi el polling de abajo puede respetar el timeout)
     # El modelo neural de AssemblyAI procesa el audio y genera texto
-    transcript = transcriber.transcribe(
+    transcript = transcriber.submit(
         audio_path,
         config=aai.TranscriptionConfig(
             language_code=language_code,
@@ -357,9 +402,10 @@ def transcribe_audio(audio_path: str, language: str) -> Tuple[str, list]:
     print(f"   ⏳ Waiting for transcription to complete...")
     # Esperar a que el modelo de IA termine de procesar
     while transcript.status not in ["completed", "error"]:
-        import time
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Transcription timed out after {timeout:.0f}s")
         time.sleep(1)
-        transcript = transcriber.get_transcript(transcript.id)
+        transcript = aai.Transcript.get_by_id(transcript.id)
         if transcript.status == "processing":
             print(f"   ⏳ Still processing...")
     
@@ -541,7 +587,8 @@ def burn_subtitles_ffmpeg(
     input_video: str,
     ass_path: str,
     output_video: str,
-    fonts_dir: str
+    fonts_dir: str,
+    timeout: float = FFMPEG_TIMEOUT
 ) -> None:
 
     os.makedirs(os.path.dirname(output_video), exist_ok=True)
@@ -599,12 +646,12 @@ def burn_subtitles_ffmpeg(
             check=True, 
             capture_output=True, 
             text=True,
-            timeout=300  # 5 minutos timeout
+            timeout=timeout  # 5 minutos por defecto (o lo que quede del deadline del job)
         )
         if result.stdout:
             print(f"   📝 FFmpeg stdout: {result.stdout[:200]}...")
     except subprocess.TimeoutExpired:
-        raise RuntimeError("FFmpeg timeout after 5 minutes")
+        raise RuntimeError(f"FFmpeg timeout after {timeout:.0f} seconds")
     except subprocess.CalledProcessError as e:
         print(f"   ❌ FFmpeg error (exit code {e.returncode}):")
         if e.stdout:
@@ -0,0 +1,33 @@
+from services.excerpt import _tokens, score_sections
+
+# Secciones de un documento de astronomia; solo la ultima trata de agujeros negros
+SECTIONS = [
+    "El sistema solar tiene ocho planetas que orbitan alrededor del sol.",
+    "Las estrellas nacen en nubes de gas y polvo llamadas nebulosas.",
+    "Un agujero negro es una región donde la gravedad impide que escape la luz.",
+]
+
+
+def test_plural_and_accent_folding():
+    assert _tokens("agujeros negros") == _tokens("agujero negro")
+    assert _tokens("redes neuronales") == _tokens("red neuronal")
+    assert _tokens("región") == _tokens("region")
+    assert _tokens("tables") == _tokens("table")
+    assert _tokens("clases") == _tokens("clase")
+
+
+def test_instructions_boost_plural_matches():
+    without = score_sections(SECTIONS)
+    with_request = score_sections(SECTIONS, "Explica los agujeros negros")
+    boost = [w - s for w, s in zip(with_request, without)]
+    assert boost[2] > 0 and boost[0] == boost[1] == 0, boost
+
+
+def main():
+    for test in (test_plural_and_accent_folding, test_instructions_boost_plural_matches):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
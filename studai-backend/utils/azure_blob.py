@@ -1,22 +1,65 @@
 import os
-from azure.storage.blob import BlobServiceClient
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import asyncio
+import math
+from utils import providers
 load_dotenv()
 
 AZURE_BLOB_ACCOUNT_NAME = os.getenv("AZURE_BLOB_ACCOUNT_NAME")
 AZURE_BLOB_KEY = os.getenv("AZURE_BLOB_KEY")
 
-blob_service_client = BlobServiceClient(
-    f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net",
-    credential=AZURE_BLOB_KEY
-)
 
-async def upload_to_blob(file_path: str, blob_name: str) -> str:
+def _build_blob_service_client():
+    """
+    Builds the shared BlobServiceClient on first use, over a pooled requests
+    session with the provider timeouts (see utils/providers.py).
+    """
+    from azure.core.pipeline.transport import RequestsTransport
+    from azure.storage.blob import BlobServiceClient
+
+    if not AZURE_BLOB_ACCOUNT_NAME or not AZURE_BLOB_KEY:
+        raise RuntimeError("AZURE_BLOB_ACCOUNT_NAME and AZURE_BLOB_KEY must be set")
+    transport = RequestsTransport(
+        session=providers.requests_session(),
+        session_owner=True,
+        connection_timeout=providers.PROVIDER_CONNECT_TIMEOUT,
+        read_timeout=providers.PROVIDER_READ_TIMEOUT,
+    )
+    return BlobServiceClient(
+        f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net",
+        credential=AZURE_BLOB_KEY,
+        transport=transport,
+    )
+
+
+providers.register("azure_blob", _build_blob_service_client, close=lambda c: c.close())
+
+
+def get_blob_service_client():
+    """Shared BlobServiceClient (created on first use)."""
+    return providers.get("azure_blob")
+
+def _upload_file(blob_client, file_path: str, timeout: float | None) -> None:
+    """Blocking upload; `timeout` also caps the client-side connect/read timeouts."""
+    upload_options = {}
+    if timeout is not None:
+        upload_options = {
+            # Server-side timeout of each operation
+            "timeout": max(1, math.ceil(timeout)),
+            # Client side: a stalled connection must not outlive the deadline
+            "connection_timeout": min(providers.PROVIDER_CONNECT_TIMEOUT, timeout),
+            "read_timeout": min(providers.PROVIDER_READ_TIMEOUT, timeout),
+        }
+    with open(file_path, "rb") as data:
+        blob_client.upload_blob(data, overwrite=True, **upload_options)
+
+
+async def upload_to_blob(file_path: str, blob_name: str, timeout: float | None = None) -> str:
     """
     Uploads a file to Azure Blob Storage and returns a SAS URL available for 1 day.
+    `timeout` (seconds) bounds the whole upload, e.g. with the job deadline: the
+    upload runs in a worker thread and TimeoutError is raised when it runs out.
     """
     print(f"Uploading file to blob: {file_path} -> {blob_name}")
 
@@ -26,14 +69,18 @@ async def upload_to_blob(file_path: str, blob_name: str) -> str:
         raise ValueError("blob_name must include container prefix (e.g. 'audio/audio.mp3')")
     container_name, blob_path = parts
 
-    blob_client = blob_service_client.get_blob_client(
+    blob_client = get_blob_service_client().get_blob_client(
         container=container_name,
         blob=blob_path
     )
 
-    # Upload the file
-    with open(file_path, "rb") as data:
-        blob_client.upload_blob(data, overwrite=True)
+    # Upload the file (off the event loop, bounded by `timeout`)
+    try:
+        await asyncio.wait_for(asyncio.to_thread(_upload_file, blob_client, file_path, timeout), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Blob upload timed out after {timeout:.1f}s: {blob_name}") from None
+
+    from azure.storage.blob import generate_blob_sas, BlobSasPermissions
 
     # Generate SAS token valid for 30 days
     sas_token = generate_blob_sas(
@@ -0,0 +1,73 @@
+# ============================================================================
+# PRESUPUESTO DE TIEMPO (DEADLINE) DE UN JOB
+# ============================================================================
+# Cada job de generacion tiene un tiempo limite total. Cada etapa del pipeline
+# (LLM, TTS, transcripcion, ffmpeg, subida a Blob) revisa el deadline antes de
+# empezar y recibe como timeout el tiempo que queda. Asi el trabajo que ya no
+# puede terminar a tiempo (el frontend deja de esperar) se abandona temprano.
+# ============================================================================
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """El job ya no puede terminar dentro de su presupuesto de tiempo."""
+
+
+class Deadline:
+    """
+    Instante limite de un job (epoch en segundos, persistible en jobs_state.json).
+
+    Uso:
+        deadline = Deadline.after(600)
+        deadline.check("tts")                 # lanza DeadlineExceeded si ya vencio
+        timeout = deadline.timeout(cap=300)   # segundos restantes (con tope opcional)
+    """
+
+    def __init__(self, expires_at: float):
+        self.expires_at = float(expires_at)
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """Crea un deadline que vence dentro de `seconds` segundos."""
+        return cls(time.time() + seconds)
+
+    def remaining(self) -> float:
+        """Segundos restantes (negativo si ya vencio)."""
+        return self.expires_at - time.time()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str, min_seconds: float = 0) -> None:
+        """
+        Verifica que queden al menos `min_seconds` antes de empezar una etapa.
+
+        Lanza:
+            DeadlineExceeded: Si no queda tiempo suficiente para la etapa
+        """
+        remaining = self.remaining()
+        if remaining <= min_seconds:
+            raise DeadlineExceeded(
+                f"Deadline exceeded before stage '{stage}' "
+                f"({max(remaining, 0):.0f}s left, {min_seconds:.0f}s needed)"
+            )
+
+    def timeout(self, cap: Optional[float] = None, stage: str = "call") -> float:
+        """
+        Timeout a usar en una llamada: el tiempo restante, limitado por `cap`.
+
+        Lanza:
+            DeadlineExceeded: Si el deadline ya vencio
+        """
+        self.check(stage)
+        remaining = self.remaining()
+        return min(remaining, cap) if cap is not None else remaining
+
+
+def timeout_for(deadline: Optional[Deadline], default: Optional[float], stage: str = "call") -> Optional[float]:
+    """Timeout de una etapa: `default` si no hay deadline, o el minimo entre ambos."""
+    if deadline is None:
+        return default
+    return deadline.timeout(cap=default, stage=stage)
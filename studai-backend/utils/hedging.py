@@ -0,0 +1,152 @@
+# ============================================================================
+# PETICIONES "HEDGED" AL LLM (RECORTAR LA COLA DE LATENCIA)
+# ============================================================================
+# La mayoria de las llamadas a chat.completions terminan rapido, pero unas pocas
+# tardan varias veces mas y dominan el p99 de los jobs. Con LLM_HEDGING=1:
+# - se guardan las latencias recientes de las llamadas
+# - si la primera peticion no respondio al llegar al percentil LLM_HEDGE_PERCENTILE
+#   de esas latencias, se lanza una segunda peticion identica
+# - gana la primera que responda y la otra se cancela
+# Las peticiones extra se limitan a LLM_HEDGE_MAX_RATE de las llamadas recientes
+# (cada hedge es una llamada mas que se paga), y en /metrics se ve cuantas veces
+# se lanzo un hedge y cuantas veces gano.
+# Si gana el hedge, la peticion original cancelada entra a las latencias con el
+# tiempo que llevaba (una cota inferior): sin eso solo se guardarian las llamadas
+# rapidas, el percentil bajaria y se harian cada vez mas hedges.
+# ============================================================================
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils import metrics
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Latencias recientes que se guardan y minimo necesario para empezar a hacer hedge
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Fraccion maxima de llamadas recientes que pueden llevar una peticion extra
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+# Nunca lanzar el hedge antes de estos segundos
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+
+_lock = threading.Lock()
+_latencies: deque = deque(maxlen=LLM_HEDGE_WINDOW)
+# True por cada llamada reciente que lanzo un hedge (para el limite de tasa)
+_hedged: deque = deque(maxlen=LLM_HEDGE_WINDOW)
+
+
+def record_latency(seconds: float) -> None:
+    """Registra la latencia de una llamada que termino."""
+    with _lock:
+        _latencies.append(seconds)
+    metrics.observe("llm.latency_seconds", seconds)
+
+
+def hedge_delay() -> Optional[float]:
+    """Segundos de espera antes del hedge (None si aun no hay suficientes latencias)."""
+    with _lock:
+        if len(_latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(_latencies)
+    index = min(len(ordered) - 1, max(0, math.ceil(LLM_HEDGE_PERCENTILE / 100 * len(ordered)) - 1))
+    return max(LLM_HEDGE_MIN_DELAY, ordered[index])
+
+
+def _hedge_allowed() -> bool:
+    with _lock:
+        return not _hedged or sum(_hedged) / len(_hedged) < LLM_HEDGE_MAX_RATE
+
+
+async def _timed(request: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.perf_counter()
+    result = await request()
+    record_latency(time.perf_counter() - started)
+    return result
+
+
+async def run(
+    request: Callable[[], Awaitable[Any]],
+    on_cancelled: Optional[Callable[[float, float], None]] = None,
+) -> Any:
+    """
+    Ejecuta una peticion async con hedge (si LLM_HEDGING=1 y hay historial).
+
+    Parametros:
+        request (Callable): Funcion sin argumentos que crea la peticion (se llama
+            una vez, o dos si se lanza el hedge)
+        on_cancelled (Callable | None): Se llama con (inicio, fin) en time.perf_counter()
+            por cada peticion que se cancelo sin terminar (para contar su costo)
+
+    Retorna:
+        El resultado de la primera peticion que termine bien
+    """
+    delay = hedge_delay() if LLM_HEDGING else None
+    primary = asyncio.ensure_future(_timed(request))
+    tasks = [primary]
+    # Inicio de cada peticion (para la latencia de las que se cancelan)
+    started: List[Tuple[asyncio.Future, float]] = [(primary, time.perf_counter())]
+    try:
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not _hedge_allowed():
+            if not done:
+                metrics.incr("llm.hedge.capped")
+            with _lock:
+                _hedged.append(False)
+            return await primary
+
+        print(f"⏱️  El LLM no respondio en {delay:.1f}s (p{LLM_HEDGE_PERCENTILE:g}): lanzando una segunda peticion")
+        metrics.incr("llm.hedge.fired")
+        with _lock:
+            _hedged.append(True)
+        hedge = asyncio.ensure_future(_timed(request))
+        tasks.append(hedge)
+        started.append((hedge, time.perf_counter()))
+
+        # Gana la primera que termine bien; si una falla se espera a la otra
+        pending = set(tasks)
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    first_error = first_error or task.exception()
+                    continue
+                metrics.incr("llm.hedge.won" if task is hedge else "llm.hedge.lost")
+                return task.result()
+        raise first_error
+    finally:
+        # La peticion perdedora (o todas, si el job se cancelo) se cancela
+        now = time.perf_counter()
+        for task, task_started in started:
+            if task.done():
+                continue
+            task.cancel()
+            if task is primary:
+                # Cota inferior de la latencia de la llamada lenta
+                record_latency(now - task_started)
+                metrics.incr("llm.hedge.censored")
+            if on_cancelled is not None:
+                on_cancelled(task_started, now)
+
+
+def stats() -> Dict:
+    """Estado del hedging para /metrics."""
+    with _lock:
+        samples = len(_latencies)
+        hedge_rate = sum(_hedged) / len(_hedged) if _hedged else None
+    return {
+        "enabled": LLM_HEDGING,
+        "delay_seconds": hedge_delay(),
+        "samples": samples,
+        "hedge_rate": hedge_rate,
+        "win_rate": metrics.ratio("llm.hedge.won", "llm.hedge.lost"),
+    }
@@ -0,0 +1,50 @@
+# ============================================================================
+# METRICAS EN MEMORIA DEL PROCESO
+# ============================================================================
+# Contadores y observaciones simples (ej: aciertos de cache, latencias) que se
+# exponen en GET /metrics. Se reinician con cada arranque del servidor.
+# ============================================================================
+
+import threading
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_observations: Dict[str, Dict[str, float]] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Incrementa un contador."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Registra una observacion (cuenta, suma, minimo y maximo)."""
+    with _lock:
+        stats = _observations.get(name)
+        if stats is None:
+            _observations[name] = {"count": 1, "sum": value, "min": value, "max": value}
+            return
+        stats["count"] += 1
+        stats["sum"] += value
+        stats["min"] = min(stats["min"], value)
+        stats["max"] = max(stats["max"], value)
+
+
+def ratio(hits: str, misses: str) -> float | None:
+    """Proporcion hits / (hits + misses) de dos contadores (None si no hay datos)."""
+    with _lock:
+        h = _counters.get(hits, 0)
+        m = _counters.get(misses, 0)
+    return h / (h + m) if (h + m) else None
+
+
+def snapshot() -> Dict:
+    """Copia de todas las metricas (con el promedio de cada observacion)."""
+    with _lock:
+        observations = {
+            name: dict(stats, avg=stats["sum"] / stats["count"])
+            for name, stats in _observations.items()
+        }
+        return {"counters": dict(_counters), "observations": observations}
@@ -0,0 +1,106 @@
+# ============================================================================
+# CACHE EN DISCO DEL TEXTO EXTRAIDO DE PDFs (DIRECCIONADO POR CONTENIDO)
+# ============================================================================
+# Los mismos PDFs de clase se suben una y otra vez. El texto extraido (por pagina,
+# con la decision texto/OCR de cada pagina) se guarda en disco con clave
+# SHA-256 del PDF + version del extractor, asi una re-subida no vuelve a parsear
+# ni a hacer OCR. El tamano total esta acotado con desalojo LRU.
+# Una entrada puede ser parcial (complete=False) si la extraccion se detuvo al
+# alcanzar el presupuesto del prompt; luego se puede continuar desde ahi.
+# ============================================================================
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from utils import metrics
+
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", "output/cache/pdf_text")
+PDF_TEXT_CACHE_MAX_MB = float(os.getenv("PDF_TEXT_CACHE_MAX_MB", "100"))
+
+_lock = threading.Lock()
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula el SHA-256 de un archivo leyendolo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_path(pdf_sha256: str, extractor_version: str) -> str:
+    key = hashlib.sha256(f"{pdf_sha256}:{extractor_version}".encode("utf-8")).hexdigest()
+    return os.path.join(PDF_TEXT_CACHE_DIR, f"{key}.json")
+
+
+def get(pdf_sha256: str, extractor_version: str) -> Optional[Dict]:
+    """
+    Busca el texto extraido de un PDF.
+
+    Retorna:
+        dict | None: {"pages": [{"page", "text", "source"}], "complete": bool}
+                     o None si no esta en cache
+    """
+    path = _entry_path(pdf_sha256, extractor_version)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entry = {"pages": data["pages"], "complete": data.get("complete", True)}
+        # Marcar como usado recientemente (el desalojo LRU usa el mtime)
+        os.utime(path, None)
+    except (FileNotFoundError, KeyError, ValueError):
+        metrics.incr("pdf_text_cache.misses")
+        return None
+    metrics.incr("pdf_text_cache.hits")
+    return entry
+
+
+def put(pdf_sha256: str, extractor_version: str, pages: List[Dict], complete: bool = True) -> None:
+    """
+    Guarda el texto extraido de un PDF y aplica el limite de tamano de la cache.
+    complete=False indica que solo se extrajeron las primeras paginas.
+    """
+    path = _entry_path(pdf_sha256, extractor_version)
+    try:
+        os.makedirs(PDF_TEXT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pdf_sha256": pdf_sha256, "extractor_version": extractor_version,
+                       "complete": complete, "pages": pages},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Escritura atomica
+        metrics.incr("pdf_text_cache.writes")
+        _evict()
+    except OSError as e:
+        print(f"⚠️  Error guardando texto en cache: {e}")
+
+
+def _evict() -> None:
+    """Borra las entradas usadas hace mas tiempo hasta quedar bajo PDF_TEXT_CACHE_MAX_MB."""
+    max_bytes = PDF_TEXT_CACHE_MAX_MB * 1024 * 1024
+    with _lock:
+        entries = []
+        for entry in os.scandir(PDF_TEXT_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                metrics.incr("pdf_text_cache.evictions")
+            except OSError:
+                pass
+
+
+def stats() -> Dict:
+    """Estadisticas de la cache para /metrics."""
+    return {"hit_rate": metrics.ratio("pdf_text_cache.hits", "pdf_text_cache.misses")}
@@ -0,0 +1,165 @@
+# ============================================================================
+# REGISTRO DE CLIENTES DE PROVEEDORES EXTERNOS (AZURE OPENAI, BLOB, ASSEMBLYAI)
+# ============================================================================
+# Cada servicio registra aqui como se construye su cliente. El cliente se crea en
+# el PRIMER USO (un error de configuracion ya no tumba el arranque) y se comparte
+# entre todos los jobs del proceso, con un pool de conexiones HTTP de tamano,
+# keep-alive y timeouts explicitos. Al arrancar se puede hacer warm-up (crear los
+# clientes antes del primer job) y al apagar se cierran los pools.
+# ============================================================================
+
+import importlib.util
+import inspect
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils import metrics
+
+# Conexiones simultaneas por proveedor y conexiones ociosas que se mantienen abiertas
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "20"))
+PROVIDER_MAX_KEEPALIVE = int(os.getenv("PROVIDER_MAX_KEEPALIVE", "10"))
+# Segundos que una conexion ociosa se mantiene abierta para reusarse
+PROVIDER_KEEPALIVE_SECONDS = float(os.getenv("PROVIDER_KEEPALIVE_SECONDS", "30"))
+# Timeouts de conexion y de lectura por peticion (el deadline del job puede recortarlos)
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "10"))
+PROVIDER_READ_TIMEOUT = float(os.getenv("PROVIDER_READ_TIMEOUT", "120"))
+# PROVIDER_HTTP2=1: los clientes async usan HTTP/2 (muchas peticiones por conexion) si h2 esta instalado
+PROVIDER_HTTP2 = os.getenv("PROVIDER_HTTP2", "1") == "1"
+# PROVIDERS_WARMUP=1: crear los clientes al arrancar el servidor (por defecto en el primer uso)
+PROVIDERS_WARMUP = os.getenv("PROVIDERS_WARMUP", "0") == "1"
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_closers: Dict[str, Callable[[Any], None]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+
+def register(name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None) -> None:
+    """
+    Registra como construir (y cerrar) el cliente de un proveedor.
+
+    Parametros:
+        name (str): Nombre del proveedor (ej: "azure_openai")
+        factory (Callable): Funcion sin argumentos que crea el cliente
+        close (Callable | None): Funcion que libera el cliente al apagar
+    """
+    with _lock:
+        _factories[name] = factory
+        if close is not None:
+            _closers[name] = close
+
+
+def get(name: str) -> Any:
+    """Cliente del proveedor (se crea en el primer uso y se reusa en todo el proceso)."""
+    client = _instances.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"Provider {name!r} is not registered")
+            _instances[name] = _factories[name]()
+            metrics.incr(f"providers.created.{name}")
+            print(f"🔌 Cliente de {name} creado")
+        return _instances[name]
+
+
+def httpx_client():
+    """Cliente httpx (sincrono) con el pool y los timeouts configurados."""
+    import httpx
+
+    return httpx.Client(limits=httpx_limits(), timeout=httpx_timeout())
+
+
+def async_httpx_client():
+    """
+    Cliente httpx asincrono con el mismo pool y timeouts. Con HTTP/2 las peticiones
+    concurrentes se multiplexan sobre pocas conexiones keep-alive y esperar la
+    respuesta no ocupa ningun hilo.
+    """
+    import httpx
+
+    http2 = PROVIDER_HTTP2 and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(limits=httpx_limits(), timeout=httpx_timeout(), http2=http2)
+
+
+def httpx_limits():
+    """Limites del pool de conexiones para clientes httpx."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=PROVIDER_MAX_CONNECTIONS,
+        max_keepalive_connections=PROVIDER_MAX_KEEPALIVE,
+        keepalive_expiry=PROVIDER_KEEPALIVE_SECONDS,
+    )
+
+
+def httpx_timeout():
+    """Timeouts por defecto de las peticiones httpx."""
+    import httpx
+
+    return httpx.Timeout(PROVIDER_READ_TIMEOUT, connect=PROVIDER_CONNECT_TIMEOUT)
+
+
+def requests_session():
+    """Sesion de requests con un pool de PROVIDER_MAX_CONNECTIONS conexiones reusables."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=PROVIDER_MAX_KEEPALIVE, pool_maxsize=PROVIDER_MAX_CONNECTIONS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def warm_up() -> Dict[str, Optional[str]]:
+    """
+    Crea todos los clientes registrados (ej: al arrancar el servidor).
+    Un proveedor mal configurado se reporta pero no detiene el resto.
+
+    Retorna:
+        dict: Proveedor -> None si se creo, o el mensaje de error
+    """
+    results: Dict[str, Optional[str]] = {}
+    for name in list(_factories):
+        try:
+            get(name)
+            results[name] = None
+        except Exception as e:
+            results[name] = str(e)
+            print(f"⚠️  No se pudo crear el cliente de {name}: {e}")
+    return results
+
+
+def close_all() -> List[Awaitable]:
+    """
+    Cierra los clientes creados (al apagar el servidor).
+
+    Retorna:
+        list: Cierres pendientes de los clientes async (ver aclose_all)
+    """
+    pending = []
+    with _lock:
+        for name, client in list(_instances.items()):
+            close = _closers.get(name)
+            if close is None:
+                continue
+            try:
+                result = close(client)
+                if inspect.isawaitable(result):
+                    pending.append(result)
+            except Exception as e:
+                print(f"⚠️  Error cerrando el cliente de {name}: {e}")
+        _instances.clear()
+    return pending
+
+
+async def aclose_all() -> None:
+    """Cierra todos los clientes, esperando el cierre de los async (desde el event loop)."""
+    for result in close_all():
+        try:
+            await result
+        except Exception as e:
+            print(f"⚠️  Error cerrando un cliente async: {e}")
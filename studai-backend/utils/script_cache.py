@@ -0,0 +1,159 @@
+# ============================================================================
+# CACHE DE GUIONES GENERADOS POR EL LLM (MEMORIA + DISCO, TTL Y LRU)
+# ============================================================================
+# Un mismo tema sin PDF con instrucciones iguales (o que solo difieren en
+# mayusculas/espacios) o la misma clase subida otra vez no deben pagar otra
+# llamada al LLM. La clave es un hash de:
+#   deployment + version de la plantilla del prompt + idioma + fragmento del PDF
+#   + instrucciones normalizadas
+# Tambien guarda los resumenes por bloque del modo documento largo (make_summary_key).
+# Dos niveles: memoria (LRU por numero de entradas) y disco (LRU por tamano, con
+# el mtime como marca de uso). Las entradas vencen a los SCRIPT_CACHE_TTL_HOURS.
+# ============================================================================
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from utils import metrics
+
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", "output/cache/scripts")
+SCRIPT_CACHE_MAX_MB = float(os.getenv("SCRIPT_CACHE_MAX_MB", "20"))
+SCRIPT_CACHE_MEMORY_ENTRIES = int(os.getenv("SCRIPT_CACHE_MEMORY_ENTRIES", "256"))
+SCRIPT_CACHE_TTL_HOURS = float(os.getenv("SCRIPT_CACHE_TTL_HOURS", "72"))
+
+_lock = threading.Lock()
+# clave -> (creado en epoch, guion)
+_memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+
+def normalize_instructions(user_additional_input: Optional[str]) -> str:
+    """Normaliza las instrucciones del usuario (minusculas y espacios colapsados)."""
+    return " ".join((user_additional_input or "").casefold().split())
+
+
+def make_key(deployment: str, template_version: str, target_lang: str, excerpt: str,
+             user_additional_input: Optional[str]) -> str:
+    """Clave de la cache para una peticion de guion."""
+    payload = json.dumps(
+        [deployment, template_version, target_lang, excerpt, normalize_instructions(user_additional_input)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_summary_key(deployment: str, template_version: str, chunk: str) -> str:
+    """
+    Clave del resumen de un bloque de un documento largo (ver genScript, modo
+    map-reduce). No incluye el idioma del guion: el mismo bloque sirve para todos.
+    """
+    payload = json.dumps(["summary", deployment, template_version, chunk], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _expired(created_at: float) -> bool:
+    return time.time() - created_at > SCRIPT_CACHE_TTL_HOURS * 3600
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(SCRIPT_CACHE_DIR, f"{key}.json")
+
+
+def get(key: str) -> Optional[str]:
+    """Busca un guion (primero en memoria, luego en disco). None si no esta o vencio."""
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if not _expired(entry[0]):
+                _memory.move_to_end(key)
+                metrics.incr("script_cache.hits")
+                metrics.incr("script_cache.memory_hits")
+                return entry[1]
+            del _memory[key]
+
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        created_at, script = float(data["created_at"]), data["script"]
+    except (FileNotFoundError, KeyError, ValueError):
+        metrics.incr("script_cache.misses")
+        return None
+
+    if _expired(created_at):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        metrics.incr("script_cache.misses")
+        return None
+
+    # Marcar como usado recientemente y subirlo a memoria
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    _remember(key, created_at, script)
+    metrics.incr("script_cache.hits")
+    return script
+
+
+def put(key: str, script: str) -> None:
+    """Guarda un guion en memoria y en disco."""
+    created_at = time.time()
+    _remember(key, created_at, script)
+    path = _entry_path(key)
+    try:
+        os.makedirs(SCRIPT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": created_at, "script": script}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Escritura atomica
+        metrics.incr("script_cache.writes")
+        _evict()
+    except OSError as e:
+        print(f"⚠️  Error guardando guion en cache: {e}")
+
+
+def _remember(key: str, created_at: float, script: str) -> None:
+    with _lock:
+        _memory[key] = (created_at, script)
+        _memory.move_to_end(key)
+        while len(_memory) > SCRIPT_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _evict() -> None:
+    """Borra del disco las entradas vencidas y las usadas hace mas tiempo hasta quedar bajo SCRIPT_CACHE_MAX_MB."""
+    max_bytes = SCRIPT_CACHE_MAX_MB * 1024 * 1024
+    with _lock:
+        entries = []
+        for entry in os.scandir(SCRIPT_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= max_bytes and not _expired(mtime):
+                break
+            try:
+                os.remove(path)
+                total -= size
+                metrics.incr("script_cache.evictions")
+            except OSError:
+                pass
+
+
+def stats() -> Dict:
+    """Estadisticas de la cache para /metrics."""
+    with _lock:
+        memory_entries = len(_memory)
+    return {
+        "hit_rate": metrics.ratio("script_cache.hits", "script_cache.misses"),
+        "memory_entries": memory_entries,
+    }
@@ -0,0 +1,98 @@
+# ============================================================================
+# PRESUPUESTO DE TOKENS DEL PROMPT
+# ============================================================================
+# Los caracteres por token cambian mucho entre espanol, ingles y ruido de OCR, asi
+# que el presupuesto del prompt se mide en TOKENS del modelo y no en caracteres.
+#
+# RELACION CON IA:
+# - IA_Clase_06 (Tokens e incrustaciones): el LLM cobra y procesa por tokens
+#
+# Si tiktoken esta instalado se usa el tokenizador real (TOKENIZER_ENCODING);
+# si no, una estimacion por palabras y signos de puntuacion.
+# ============================================================================
+
+import math
+import os
+import re
+from typing import Dict, List
+
+# Codificacion de los modelos GPT-4o / GPT-5 (o200k_base)
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+
+# Tokens extra que agrega el formato de chat por mensaje y por respuesta
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_REPLY = 3
+
+_WORD_OR_SYMBOL_RE = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Tokenizador de tiktoken (opcional, se carga en el primer uso); None si no esta instalado."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken  # type: ignore
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except ImportError:
+            _encoding = None
+        except Exception as e:
+            print(f"⚠️  No se pudo cargar el tokenizador {TOKENIZER_ENCODING}: {e}")
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cuenta los tokens de un texto.
+
+    Sin tiktoken se estima: cada palabra larga cuenta como ~1 token por cada 4
+    caracteres (minimo 1) y cada signo de puntuacion como 1 token.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _WORD_OR_SYMBOL_RE.findall(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Tokens de una lista de mensajes de chat (incluye el formato de cada mensaje)."""
+    return sum(_TOKENS_PER_MESSAGE + count_tokens(m.get("content", "")) for m in messages) + _TOKENS_PER_REPLY
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Recorta un texto para que tenga como maximo max_tokens tokens.
+
+    Retorna:
+        str: El texto completo si cabe; si no, el prefijo mas largo que cabe
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Busqueda binaria del prefijo mas largo que cabe
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def backend_name() -> str:
+    """Nombre del metodo de conteo en uso (para logs)."""
+    return f"tiktoken:{TOKENIZER_ENCODING}" if _get_encoding() is not None else "estimado"
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Verifica que importar main.py (lo que paga cada arranque en frio antes de que
+/health responda) se mantenga dentro de un presupuesto de tiempo y que no cargue
+las dependencias pesadas de video, OCR y TTS, que deben importarse en su primer uso.
+
+Uso:
+    python verificar_arranque.py [max_segundos]
+
+Termina con codigo 1 si se pasa del presupuesto o si se importa algun modulo pesado.
+"""
+import json
+import subprocess
+import sys
+
+# Presupuesto por defecto para `import main` (segundos)
+MAX_SEGUNDOS = 3.0
+
+# Modulos que NO deben cargarse al importar main.py
+MODULOS_PESADOS = (
+    "fitz",
+    "pypdf",
+    "PyPDF2",
+    "pytesseract",
+    "tesserocr",
+    "PIL",
+    "moviepy",
+    "assemblyai",
+    "azure.cognitiveservices.speech",
+    "openai",
+    "tiktoken",
+)
+
+_CODIGO = f"""
+import json, sys, time
+inicio = time.perf_counter()
+import main
+segundos = time.perf_counter() - inicio
+pesados = [m for m in {MODULOS_PESADOS!r} if m in sys.modules]
+print(json.dumps({{"segundos": segundos, "pesados": pesados}}))
+"""
+
+
+def medir() -> tuple[dict, list[tuple[int, str]]]:
+    """Importa main.py en un proceso limpio y retorna la medicion y los imports mas lentos."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CODIGO],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit(f"❌ ERROR: importar main.py fallo (codigo {proc.returncode})")
+
+    # -X importtime escribe en stderr: "import time: self [us] | cumulative | nombre"
+    lentos = []
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        partes = linea.split("|")
+        try:
+            lentos.append((int(partes[1].strip()), partes[2].rstrip()))
+        except (IndexError, ValueError):
+            continue
+    lentos.sort(reverse=True)
+
+    resultado = json.loads(proc.stdout.strip().splitlines()[-1])
+    return resultado, lentos[:10]
+
+
+def main():
+    max_segundos = float(sys.argv[1]) if len(sys.argv) > 1 else MAX_SEGUNDOS
+    resultado, lentos = medir()
+
+    print(f"⏱️  import main: {resultado['segundos']:.2f}s (presupuesto {max_segundos:.2f}s)")
+    print("\n📊 Imports mas lentos (acumulado):")
+    for microsegundos, nombre in lentos:
+        print(f"   {microsegundos / 1000:8.1f} ms  {nombre}")
+
+    ok = True
+    if resultado["pesados"]:
+        print(f"\n❌ ERROR: main.py importa modulos pesados al arrancar: {', '.join(resultado['pesados'])}")
+        ok = False
+    if resultado["segundos"] > max_segundos:
+        print(f"\n❌ ERROR: el import supera el presupuesto de {max_segundos:.2f}s")
+        ok = False
+
+    if ok:
+        print("\n✅ Arranque dentro del presupuesto")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()